@@ -0,0 +1,45 @@
+"""Shared on-disk cache of extracted FIT years for the counting scripts.
+
+Re-running the counters used to reparse every FIT file from scratch.
+Files never change once exported, so cache the extracted year in a
+sqlite sidecar keyed by (path, size, mtime) and only reparse entries
+whose fingerprint changed. A missing year (unparseable file) is cached
+too, as NULL, so broken files are not reparsed either.
+"""
+from pathlib import Path
+import sqlite3
+
+CACHE_NAME = '.fit_year_cache.sqlite'
+
+
+class FitYearCache:
+    def __init__(self, folder: Path):
+        self.conn = sqlite3.connect(Path(folder) / CACHE_NAME)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS years ("
+            "path TEXT PRIMARY KEY, size INT, mtime REAL, year INT)"
+        )
+        # Load everything once; the table is tiny compared to the FIT files
+        self._rows = {
+            path: (size, mtime, year)
+            for path, size, mtime, year in self.conn.execute(
+                "SELECT path, size, mtime, year FROM years"
+            )
+        }
+
+    def lookup(self, path: str, size: int, mtime: float):
+        """Return (hit, year); year may be None even on a hit."""
+        row = self._rows.get(path)
+        if row and row[0] == size and row[1] == mtime:
+            return True, row[2]
+        return False, None
+
+    def store(self, path: str, size: int, mtime: float, year):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO years (path, size, mtime, year) VALUES (?, ?, ?, ?)",
+            (path, size, mtime, year),
+        )
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
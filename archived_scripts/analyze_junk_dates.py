@@ -1,95 +1,89 @@
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from fitparse import FitFile, FitParseError
 from typing import Any
 from dotenv import load_dotenv
 from os import getenv
 import datetime
+import os
 
 load_dotenv(encoding='utf-8')
 FIT_FOLDER = Path(getenv('FIT_FOLDER') or Path.cwd())
 JUNK = FIT_FOLDER / "_junk"
 
-if not JUNK.exists():
-    print("_junk folder not found")
-    raise SystemExit(0)
-
-counts = {
-    'total': 0,
-    'with_ts': 0,
-    'before_2024': 0,
-}
-
-examples_before = []
-examples_after = []
-
 cutoff = datetime.datetime(2024,1,1)
 
-def extract_dt(path: Path):
+def extract_dt(path_str: str):
     try:
-        fit = FitFile(str(path))
-        # Check session start_time
-        for m in fit.get_messages('session'):
-            try:
-                if hasattr(m, "get_value"):
-                    v = getattr(m, "get_value")('start_time')  # type: Any
-                    if v:
-                        return v
-            except Exception:
-                continue
-        # activity
-        for m in fit.get_messages('activity'):
-            for key in ('local_timestamp', 'timestamp'):
-                try:
-                    if hasattr(m, "get_value"):
-                        v = getattr(m, "get_value")(key)  # type: Any
-                        if v:
-                            return v
-                except Exception:
-                    continue
-        # records
-        for m in fit.get_messages('record'):
-            try:
-                if hasattr(m, "get_value"):
-                    v = getattr(m, "get_value")('timestamp')  # type: Any
-                    if v:
-                        return v
-            except Exception:
-                continue
-        return None
+        # One bulk sequential read; fitparse then decodes from RAM instead
+        # of seeking/reading the file in small increments
+        data = Path(path_str).read_bytes()
+        # A valid FIT file is a 12/14-byte header plus at least one
+        # definition+data message and a CRC; anything smaller, or without
+        # the '.FIT' magic, is junk not worth handing to fitparse
+        if len(data) < 32 or data[8:12] != b'.FIT':
+            return None
+        fit = FitFile(BytesIO(data))
+        # Chained next() generators stop the lazy parse at the first
+        # usable timestamp instead of materializing whole message lists;
+        # session start_time, then activity, then first record
+        v = next((v for m in fit.get_messages('session')
+                  if (v := m.get_value('start_time'))), None)
+        if v:
+            return v
+        v = next((v for m in fit.get_messages('activity')
+                  if (v := m.get_value('local_timestamp') or m.get_value('timestamp'))), None)
+        if v:
+            return v
+        return next((v for m in fit.get_messages('record')
+                     if (v := m.get_value('timestamp'))), None)
     except FitParseError:
         return None
     except Exception:
         return None
 
-for p in JUNK.glob('*.fit'):
-    counts['total'] += 1
-    dt = extract_dt(p)
-    if dt is None:
-        continue
-    counts['with_ts'] += 1
-    if isinstance(dt, str):
-        try:
-            dt = datetime.datetime.fromisoformat(dt)
-        except Exception:
-            # try common format
-            try:
-                dt = datetime.datetime.strptime(dt, '%Y-%m-%d %H:%M:%S')
-            except Exception:
+
+if __name__ == '__main__':
+    if not JUNK.exists():
+        print("_junk folder not found")
+        raise SystemExit(0)
+
+    counts = {
+        'total': 0,
+        'with_ts': 0,
+        'before_2024': 0,
+    }
+
+    examples_before = []
+    examples_after = []
+
+    paths = [str(p) for p in JUNK.glob('*.fit')]
+    counts['total'] = len(paths)
+
+    # Timestamp extraction parses FIT records (CPU-bound); run across cores
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for path_str, dt in zip(paths, ex.map(extract_dt, paths, chunksize=64)):
+            if dt is None:
                 continue
-    if dt < cutoff:
-        counts['before_2024'] += 1
-        if len(examples_before) < 10:
-            examples_before.append((p.name, dt.isoformat()))
-    else:
-        if len(examples_after) < 10:
-            examples_after.append((p.name, dt.isoformat()))
+            counts['with_ts'] += 1
+            name = Path(path_str).name
+            # fitparse already hands back datetime objects for these
+            # fields, so no fromisoformat/strptime fallback is needed
+            if dt < cutoff:
+                counts['before_2024'] += 1
+                if len(examples_before) < 10:
+                    examples_before.append((name, dt.isoformat()))
+            else:
+                if len(examples_after) < 10:
+                    examples_after.append((name, dt.isoformat()))
 
-print(f"Total in _junk: {counts['total']}")
-print(f"Files with parseable timestamps: {counts['with_ts']}")
-print(f"Files before 2024: {counts['before_2024']}")
-print('\nExamples before 2024:')
-for n,d in examples_before:
-    print(n, d)
-print('\nExamples after 2024:')
-for n,d in examples_after:
-    print(n, d)
+    print(f"Total in _junk: {counts['total']}")
+    print(f"Files with parseable timestamps: {counts['with_ts']}")
+    print(f"Files before 2024: {counts['before_2024']}")
+    print('\nExamples before 2024:')
+    for n,d in examples_before:
+        print(n, d)
+    print('\nExamples after 2024:')
+    for n,d in examples_after:
+        print(n, d)
@@ -1,29 +1,36 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from fitparse import FitFile
 from typing import Any
 from dotenv import load_dotenv
 from os import getenv
+import os
+
+from _fit_year_cache import FitYearCache
 
 load_dotenv(encoding='utf-8')
 FIT_FOLDER = Path(getenv('FIT_FOLDER') or Path.cwd())
 
-counts = {}
-missing = 0
-total = 0
 
-for p in sorted(FIT_FOLDER.iterdir()):
-    if not p.is_file() or p.suffix.lower() != '.fit':
-        continue
-    if p.parent.name in ('_junk', '_failed'):
-        continue
-    total += 1
+def _extract_year(path_str: str):
+    """Parse one FIT file and return its file_id year, or None."""
     try:
-        fit = FitFile(str(p))
-        msgs = list(fit.get_messages('file_id'))
-        if not msgs:
-            missing += 1
-            continue
-        m = msgs[0]
+        # One bulk sequential read; fitparse then decodes from RAM instead
+        # of seeking/reading the file in small increments
+        data = Path(path_str).read_bytes()
+        # A valid FIT file is a 12/14-byte header plus at least one
+        # definition+data message and a CRC; anything smaller, or without
+        # the '.FIT' magic, is junk not worth handing to fitparse
+        if len(data) < 32 or data[8:12] != b'.FIT':
+            return None
+        fit = FitFile(BytesIO(data))
+        # get_messages is lazy; stop after the first file_id instead of
+        # decoding every record message in the file
+        m = next(iter(fit.get_messages('file_id')), None)
+        if m is None:
+            return None
         try:
             # Guard access because some fitparse versions may yield dict-like
             # message objects in certain environments; use getattr or dict
@@ -36,15 +43,61 @@ for p in sorted(FIT_FOLDER.iterdir()):
         except Exception:
             t = None
         if t is None:
+            return None
+        return t.year
+    except Exception:
+        return None
+
+
+if __name__ == '__main__':
+    # scandir exposes d_type from the directory entry, so the file-vs-dir
+    # test costs no extra stat() per entry; subdirs like _junk/_failed are
+    # excluded for free since only the top level is scanned
+    entries = []
+    with os.scandir(FIT_FOLDER) as it:
+        for e in it:
+            if e.is_file(follow_symlinks=False) and e.name.endswith(('.fit', '.FIT')):
+                st = e.stat()
+                entries.append((e.path, st.st_size, st.st_mtime))
+    entries.sort()
+
+    counts = Counter()
+    missing = 0
+
+    def tally(year):
+        global missing
+        if year is None:
             missing += 1
+        else:
+            counts[year] += 1
+
+    # Serve unchanged files from the sidecar cache; only reparse files
+    # whose (size, mtime) fingerprint changed since the last run
+    cache = FitYearCache(FIT_FOLDER)
+    to_parse = []
+    for path, size, mtime in entries:
+        if size < 32:
+            # stat already gave us the size; too small to be a valid FIT
+            tally(None)
             continue
-        year = t.year
-        counts[year] = counts.get(year, 0) + 1
-    except Exception:
-        missing += 1
+        hit, year = cache.lookup(path, size, mtime)
+        if hit:
+            tally(year)
+        else:
+            to_parse.append((path, size, mtime))
+
+    # FIT decoding is pure-Python CPU work, so parse across all cores
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        results = ex.map(_extract_year, [p for p, _, _ in to_parse], chunksize=64)
+        for (path, size, mtime), year in zip(to_parse, results):
+            cache.store(path, size, mtime, year)
+            tally(year)
+    cache.close()
 
-print(f"Top-level .fit total: {total}")
-print('By year:')
-for y in sorted(counts):
-    print(y, counts[y])
-print('Missing:', missing)
+    # Sort once and emit the report with a single join/print
+    items = sorted(counts.items())
+    print(f"Top-level .fit total: {len(entries)}")
+    print('By year:')
+    if items:
+        print('\n'.join(f'{y} {n}' for y, n in items))
+    print('Missing:', missing)
@@ -1,41 +1,95 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from fitparse import FitFile
 import datetime
 from dotenv import load_dotenv
 from os import getenv
+import os
+
+from _fit_year_cache import FitYearCache
 
 load_dotenv(encoding='utf-8')
 FIT_FOLDER = Path(getenv('FIT_FOLDER') or Path.cwd())
 JUNK = FIT_FOLDER / "_junk"
 
-if not JUNK.exists():
-    print("_junk not found")
-    raise SystemExit(0)
-
-counts = {}
-missing = 0
 
-for p in JUNK.glob('*.fit'):
+def _extract_year(path_str: str):
+    """Parse one FIT file and return its file_id year, or None."""
     try:
-        fit = FitFile(str(p))
-        msgs = list(fit.get_messages('file_id'))
-        if not msgs:
-            missing += 1
-            continue
-        m = msgs[0]
+        # One bulk sequential read; fitparse then decodes from RAM instead
+        # of seeking/reading the file in small increments
+        data = Path(path_str).read_bytes()
+        # A valid FIT file is a 12/14-byte header plus at least one
+        # definition+data message and a CRC; anything smaller, or without
+        # the '.FIT' magic, is junk not worth handing to fitparse
+        if len(data) < 32 or data[8:12] != b'.FIT':
+            return None
+        fit = FitFile(BytesIO(data))
+        # get_messages is lazy; stop after the first file_id instead of
+        # decoding every record message in the file
+        m = next(iter(fit.get_messages('file_id')), None)
+        if m is None:
+            return None
         try:
             t = m.get_value('time_created')
         except Exception:
             t = None
         if t is None:
+            return None
+        return t.year
+    except Exception:
+        return None
+
+
+if __name__ == '__main__':
+    if not JUNK.exists():
+        print("_junk not found")
+        raise SystemExit(0)
+
+    # scandir avoids the per-entry Path construction and stat of glob
+    entries = []
+    with os.scandir(JUNK) as it:
+        for e in it:
+            if e.is_file(follow_symlinks=False) and e.name.endswith(('.fit', '.FIT')):
+                st = e.stat()
+                entries.append((e.path, st.st_size, st.st_mtime))
+
+    counts = Counter()
+    missing = 0
+
+    def tally(year):
+        global missing
+        if year is None:
             missing += 1
+        else:
+            counts[year] += 1
+
+    # Reparse only files whose (size, mtime) fingerprint changed
+    cache = FitYearCache(JUNK)
+    to_parse = []
+    for path, size, mtime in entries:
+        if size < 32:
+            # stat already gave us the size; too small to be a valid FIT
+            tally(None)
             continue
-        year = t.year
-        counts[year] = counts.get(year, 0) + 1
-    except Exception:
-        missing += 1
+        hit, year = cache.lookup(path, size, mtime)
+        if hit:
+            tally(year)
+        else:
+            to_parse.append((path, size, mtime))
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        results = ex.map(_extract_year, [p for p, _, _ in to_parse], chunksize=64)
+        for (path, size, mtime), year in zip(to_parse, results):
+            cache.store(path, size, mtime, year)
+            tally(year)
+    cache.close()
 
-print('Totals by year (file_id.time_created):')
-for y in sorted(counts):
-    print(y, counts[y])
-print('Missing file_id.time_created:', missing)
+    # Sort once and emit the report with a single join/print
+    items = sorted(counts.items())
+    print('Totals by year (file_id.time_created):')
+    if items:
+        print('\n'.join(f'{y} {n}' for y, n in items))
+    print('Missing file_id.time_created:', missing)
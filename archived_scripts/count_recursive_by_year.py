@@ -1,48 +1,107 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from fitparse import FitFile
 from dotenv import load_dotenv
 from os import getenv
+import os
+
+from _fit_year_cache import FitYearCache
 
 load_dotenv(encoding='utf-8')
 FIT_FOLDER = Path(getenv('FIT_FOLDER') or Path.cwd())
 
-counts = {}
-missing = 0
-total = 0
-oldest_mtime_examples = []
 
-for p in FIT_FOLDER.rglob('*.fit'):
-    total += 1
+def _extract_year(path_str: str):
+    """Parse one FIT file and return its file_id year, or None."""
     try:
-        fit = FitFile(str(p))
-        msgs = list(fit.get_messages('file_id'))
-        if not msgs:
-            missing += 1
-            # collect mtime sample
-            if len(oldest_mtime_examples) < 10:
-                oldest_mtime_examples.append((p.name, p.stat().st_mtime))
-            continue
-        m = msgs[0]
+        # One bulk sequential read; fitparse then decodes from RAM instead
+        # of seeking/reading the file in small increments
+        data = Path(path_str).read_bytes()
+        # A valid FIT file is a 12/14-byte header plus at least one
+        # definition+data message and a CRC; anything smaller, or without
+        # the '.FIT' magic, is junk not worth handing to fitparse
+        if len(data) < 32 or data[8:12] != b'.FIT':
+            return None
+        fit = FitFile(BytesIO(data))
+        # get_messages is lazy; stop after the first file_id instead of
+        # decoding every record message in the file
+        m = next(iter(fit.get_messages('file_id')), None)
+        if m is None:
+            return None
         try:
             t = m.get_value('time_created')
         except Exception:
             t = None
         if t is None:
+            return None
+        return t.year
+    except Exception:
+        return None
+
+
+if __name__ == '__main__':
+    # os.walk yields plain string paths without the per-entry Path
+    # construction and stat calls of rglob; prune _junk/_failed so the
+    # walk never descends into them
+    paths = []
+    for root, dirs, files in os.walk(FIT_FOLDER):
+        dirs[:] = [d for d in dirs if d not in ('_junk', '_failed')]
+        for f in files:
+            if f.endswith(('.fit', '.FIT')):
+                paths.append(os.path.join(root, f))
+
+    counts = Counter()
+    missing = 0
+    oldest_mtime_examples = []
+
+    def tally(path_str, mtime, year):
+        global missing
+        if year is None:
             missing += 1
+            # collect mtime sample
             if len(oldest_mtime_examples) < 10:
-                oldest_mtime_examples.append((p.name, p.stat().st_mtime))
+                oldest_mtime_examples.append((os.path.basename(path_str), mtime))
+        else:
+            counts[year] += 1
+
+    # Serve unchanged files from the sidecar cache; only reparse files
+    # whose (size, mtime) fingerprint changed since the last run
+    cache = FitYearCache(FIT_FOLDER)
+    to_parse = []
+    for path_str in paths:
+        try:
+            st = os.stat(path_str)
+        except OSError:
+            missing += 1
             continue
-        year = t.year
-        counts[year] = counts.get(year, 0) + 1
-    except Exception:
-        missing += 1
-
-print('Total FIT files:', total)
-print('By year:')
-for y in sorted(counts):
-    print(y, counts[y])
-print('Missing file_id.time_created:', missing)
-print('\nSample of files missing file_id.time_created (name, mtime):')
-for n,mt in oldest_mtime_examples:
-    from datetime import datetime
-    print(n, datetime.fromtimestamp(mt).isoformat())
+        if st.st_size < 32:
+            # too small to be a valid FIT; skip the parse entirely
+            tally(path_str, st.st_mtime, None)
+            continue
+        hit, year = cache.lookup(path_str, st.st_size, st.st_mtime)
+        if hit:
+            tally(path_str, st.st_mtime, year)
+        else:
+            to_parse.append((path_str, st.st_size, st.st_mtime))
+
+    # Parse in parallel; decoding is CPU-bound pure Python
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        results = ex.map(_extract_year, [p for p, _, _ in to_parse], chunksize=64)
+        for (path_str, size, mtime), year in zip(to_parse, results):
+            cache.store(path_str, size, mtime, year)
+            tally(path_str, mtime, year)
+    cache.close()
+
+    # Sort once and emit the report with a single join/print
+    items = sorted(counts.items())
+    print('Total FIT files:', len(paths))
+    print('By year:')
+    if items:
+        print('\n'.join(f'{y} {n}' for y, n in items))
+    print('Missing file_id.time_created:', missing)
+    print('\nSample of files missing file_id.time_created (name, mtime):')
+    for n, mt in oldest_mtime_examples:
+        from datetime import datetime
+        print(n, datetime.fromtimestamp(mt).isoformat())
@@ -13,46 +13,21 @@ folders = [(JUNK, "_junk"), (FAILED, "_failed")]
 def extract_start(path: Path):
     try:
         fit = FitFile(str(path))
-        # Try session/start_time -> activity -> record timestamp
-        # Check session messages
-        for m in fit.get_messages('session'):
-            try:
-                if hasattr(m, "get_value"):
-                    v = getattr(m, "get_value")('start_time')  # dynamic access
-                elif isinstance(m, dict):
-                    v = m.get('start_time')
-                else:
-                    v = None
-                if v:
-                    return str(v)
-            except Exception:
-                continue
-        # Check activity messages
-        for m in fit.get_messages('activity'):
-            try:
-                if hasattr(m, "get_value"):
-                    v = getattr(m, "get_value")('local_timestamp') or getattr(m, "get_value")('timestamp')
-                elif isinstance(m, dict):
-                    v = m.get('local_timestamp') or m.get('timestamp')
-                else:
-                    v = None
-                if v:
-                    return str(v)
-            except Exception:
-                continue
-        # Fallback to first record timestamp
-        for m in fit.get_messages('record'):
-            try:
-                if hasattr(m, "get_value"):
-                    v = getattr(m, "get_value")('timestamp')
-                elif isinstance(m, dict):
-                    v = m.get('timestamp')
-                else:
-                    v = None
-                if v:
-                    return str(v)
-            except Exception:
-                continue
+        # Try session/start_time -> activity -> record timestamp.
+        # Chained next() generators stop the lazy parse at the first hit
+        # rather than iterating every matching message
+        v = next((v for m in fit.get_messages('session')
+                  if (v := m.get_value('start_time'))), None)
+        if v:
+            return str(v)
+        v = next((v for m in fit.get_messages('activity')
+                  if (v := m.get_value('local_timestamp') or m.get_value('timestamp'))), None)
+        if v:
+            return str(v)
+        v = next((v for m in fit.get_messages('record')
+                  if (v := m.get_value('timestamp'))), None)
+        if v:
+            return str(v)
         return 'no-timestamp'
     except FitParseError as e:
         return f'parse-error:{e}'
@@ -1,11 +1,10 @@
+import asyncio
 import sys
-import threading
 import webbrowser
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse
 from pathlib import Path
-import time
 import os
+import re
 
 from dotenv import load_dotenv
 
@@ -20,49 +19,58 @@ from strava_importer.auth import StravaAuth
 DEFAULT_PORT = 53682
 DEFAULT_PATH = "/callback"
 
-
-class OAuthHandler(BaseHTTPRequestHandler):
-    server_version = "OAuthCatcher/1.0"
-
-    def do_GET(self):
-        parsed = urlparse(self.path)
-        if parsed.path != DEFAULT_PATH:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"Not Found")
-            return
-
-        qs = parse_qs(parsed.query)
-        code = qs.get("code", [None])[0]
-        if not code:
-            self.send_response(400)
-            self.end_headers()
-            self.wfile.write(b"Missing code param")
-            return
-
-        # Save code to server object and notify
-        self.server.auth_code = code
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b"Authorization code received. You can close this window.")
+_CODE_RE = re.compile(rb"GET /callback\?\S*?code=([^ &]+)")
+
+
+async def _catch_code(port: int, timeout: float = 300.0):
+    """Listen for the single OAuth redirect and return the code, or None.
+
+    A minimal asyncio TCP listener replaces the old HTTPServer+thread
+    combo: one GET comes in, the code is regex-extracted from the
+    request line, and a Future completes. No thread startup, no polling.
+    """
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future = loop.create_future()
+
+    async def handle(reader, writer):
+        line = await reader.readline()
+        m = _CODE_RE.search(line)
+        if m:
+            body = b"Authorization code received. You can close this window."
+            status = b"200 OK"
+        else:
+            body = b"Missing code param"
+            status = b"400 Bad Request"
+        writer.write(
+            b"HTTP/1.1 " + status + b"\r\n"
+            b"Content-Type: text/plain\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+            b"Connection: close\r\n\r\n" + body
+        )
+        await writer.drain()
+        writer.close()
+        if m and not future.done():
+            future.set_result(m.group(1).decode())
+
+    server = await asyncio.start_server(handle, "", port)
+    try:
+        return await asyncio.wait_for(future, timeout=timeout)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        server.close()
+        await server.wait_closed()
 
 
 def write_env_auth_code(env_path: Path, code: str):
-    text = ""
-    if env_path.exists():
-        text = env_path.read_text(encoding="utf-8")
-
-    lines = text.splitlines()
-    found = False
-    for i, line in enumerate(lines):
-        if line.strip().startswith("AUTH_CODE="):
-            lines[i] = f"AUTH_CODE={code}"
-            found = True
-            break
-    if not found:
-        lines.append(f"AUTH_CODE={code}")
-
-    env_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    # Single-pass substitution instead of splitlines/scan/join, which
+    # allocated three strings proportional to the file size
+    text = env_path.read_text(encoding="utf-8") if env_path.exists() else ""
+    new, n = re.subn(r"(?m)^AUTH_CODE=.*$", f"AUTH_CODE={code}", text, count=1)
+    if n == 0:
+        sep = "" if not text or text.endswith("\n") else "\n"
+        new = f"{text}{sep}AUTH_CODE={code}\n"
+    env_path.write_text(new, encoding="utf-8")
 
 
 def run_oauth_catcher():
@@ -81,15 +89,6 @@ def run_oauth_catcher():
     if path != DEFAULT_PATH:
         print(f"Notice: using redirect path {path}. Server expects {DEFAULT_PATH}")
 
-    server = HTTPServer(("", port), OAuthHandler)
-    server.auth_code = None
-
-    def serve():
-        server.handle_request()  # handle a single request then exit
-
-    t = threading.Thread(target=serve, daemon=True)
-    t.start()
-
     auth_url = (
         f"https://www.strava.com/oauth/authorize?client_id={client_id}"
         f"&response_type=code&redirect_uri={redirect_uri}"
@@ -100,37 +99,33 @@ def run_oauth_catcher():
     print(auth_url)
     webbrowser.open(auth_url)
 
-    # Wait for code (timeout 300s)
-    start = time.time()
-    while time.time() - start < 300:
-        if getattr(server, "auth_code", None):
-            code = server.auth_code
-            print("Received code:", code)
-            # update .env
-            env_path = Path.cwd() / ".env"
-            write_env_auth_code(env_path, code)
-            print(f"Wrote AUTH_CODE to {env_path}")
-
-            # Exchange the code immediately to persist tokens
+    code = asyncio.run(_catch_code(port))
+    if not code:
+        print("Timeout waiting for authorization code")
+        return 1
+
+    print("Received code:", code)
+    # update .env
+    env_path = Path.cwd() / ".env"
+    write_env_auth_code(env_path, code)
+    print(f"Wrote AUTH_CODE to {env_path}")
+
+    # Exchange the code immediately to persist tokens
+    try:
+        auth = StravaAuth(client_id, client_secret, code, token_file=Path.cwd() / ".strava_tokens.json")
+        token = auth.exchange_code()
+        print("Token exchange successful. Access token saved to .strava_tokens.json")
+        return 0
+    except Exception as e:
+        print("Token exchange failed:", e)
+        resp = getattr(e, 'response', None)
+        if resp is not None:
             try:
-                auth = StravaAuth(client_id, client_secret, code, token_file=Path.cwd() / ".strava_tokens.json")
-                token = auth.exchange_code()
-                print("Token exchange successful. Access token saved to .strava_tokens.json")
-                return 0
-            except Exception as e:
-                print("Token exchange failed:", e)
-                resp = getattr(e, 'response', None)
-                if resp is not None:
-                    try:
-                        print('STATUS:', resp.status_code)
-                        print('BODY:', resp.text)
-                    except Exception:
-                        pass
-                return 1
-        time.sleep(0.5)
-
-    print("Timeout waiting for authorization code")
-    return 1
+                print('STATUS:', resp.status_code)
+                print('BODY:', resp.text)
+            except Exception:
+                pass
+        return 1
 
 
 if __name__ == "__main__":
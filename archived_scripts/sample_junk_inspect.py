@@ -1,7 +1,11 @@
+from io import BytesIO
 from pathlib import Path
 from fitparse import FitFile
 from dotenv import load_dotenv
 from os import getenv
+import os
+import queue
+import threading
 
 load_dotenv(encoding='utf-8')
 FIT_FOLDER = Path(getenv('FIT_FOLDER') or Path.cwd())
@@ -11,13 +15,39 @@ if not JUNK.exists():
     print("_junk not found")
     raise SystemExit(0)
 
-files = sorted(JUNK.glob('*.fit'))[:30]
+# scandir gives file-vs-dir from the directory entry without extra stats
+with os.scandir(JUNK) as it:
+    files = sorted(
+        (Path(e.path) for e in it
+         if e.is_file(follow_symlinks=False) and e.name.endswith(('.fit', '.FIT'))),
+    )[:30]
 print(f"Inspecting {len(files)} files from _junk (sample)")
-for p in files:
+
+# Prefetch the next file's bytes on a background thread while the main
+# thread decodes the current one; the bounded queue caps memory at two
+# files' worth and overlaps read latency with parse time
+_q: "queue.Queue" = queue.Queue(maxsize=2)
+
+def _producer():
+    for p in files:
+        try:
+            _q.put((p, p.read_bytes()))
+        except OSError as e:
+            _q.put((p, e))
+    _q.put(None)
+
+threading.Thread(target=_producer, daemon=True).start()
+
+while (item := _q.get()) is not None:
+    p, blob = item
     print('---')
-    print(p.name, 'size=', p.stat().st_size)
+    if isinstance(blob, OSError):
+        print(p.name, 'read error:', blob)
+        continue
+    print(p.name, 'size=', len(blob))
     try:
-        fit = FitFile(str(p))
+        # Parse the prefetched bytes from memory
+        fit = FitFile(BytesIO(blob))
         file_id_msgs = list(fit.get_messages('file_id'))
         if not file_id_msgs:
             print('file_id: <not found>')
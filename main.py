@@ -1,23 +1,17 @@
 import sys
-from os import getenv
 from pathlib import Path
 
-from dotenv import load_dotenv
-
 from strava_importer.config import AppConfig
-from strava_importer.async_core import AsyncStravaUploader
-from strava_importer.cleaner import pre_sweep_move_junk
+from strava_importer.env import env
 from strava_importer.utils import configure_logging
 
-# Load environment from .env (if present)
-load_dotenv(encoding="utf-8")
-
-# --- CONFIGURATION (from environment) ---
-CLIENT_ID = getenv("CLIENT_ID")
-CLIENT_SECRET = getenv("CLIENT_SECRET")
-AUTH_CODE = getenv("AUTH_CODE")
-FIT_FOLDER = getenv("FIT_FOLDER")
-MAX_CONCURRENT = int(getenv("MAX_CONCURRENT", "5"))
+# --- CONFIGURATION (from environment, .env loaded once) ---
+_env = env()
+CLIENT_ID = _env["CLIENT_ID"]
+CLIENT_SECRET = _env["CLIENT_SECRET"]
+AUTH_CODE = _env["AUTH_CODE"]
+FIT_FOLDER = _env["FIT_FOLDER"]
+MAX_CONCURRENT = _env["MAX_CONCURRENT"]
 
 
 def main() -> None:
@@ -49,26 +43,36 @@ def main() -> None:
         logging.critical(f"FIT_FOLDER is missing or does not exist: {config.fit_folder}")
         return
 
-    try:
-        pre_sweep_summary = pre_sweep_move_junk(config.fit_folder)
-        print("\n--- Pre-sweep Report ---")
-        print(f"  Inspected: {pre_sweep_summary['inspected']}")
-        print(f"  Moved to _junk: {pre_sweep_summary['moved']}")
-        if pre_sweep_summary["errors"] > 0:
-            print(f"  Errors: {pre_sweep_summary['errors']}")
-        print("------------------------\n")
-    except Exception:
-        logging.exception("Pre-sweep failed; continuing to upload existing files")
+    # Import the heavy modules (fitparse, aiohttp) only once the config is
+    # valid, so misconfigured runs fail fast without paying the import cost
+    from strava_importer.cleaner import pre_sweep_move_junk
+    from strava_importer.async_core import AsyncStravaUploader
+
+    uploader = AsyncStravaUploader(config)
+
+    # The pre-sweep streams its keep verdicts straight into the
+    # uploader's work queue, so the first POST overlaps the tail of the
+    # inspection instead of waiting for the whole folder to be vetted
+    def _sweep(on_keep):
+        return pre_sweep_move_junk(config.fit_folder, on_keep=on_keep)
 
     try:
         # Run async uploader with configured concurrency
-        uploader = AsyncStravaUploader(config)
-        uploader.run(max_concurrent=MAX_CONCURRENT)
+        uploader.run(max_concurrent=MAX_CONCURRENT, pre_sweep=_sweep)
     except KeyboardInterrupt:
         print("\nStopped by user.")
     except Exception as e:
         logging.critical(f"Fatal Error: {e}")
 
+    pre_sweep_summary = uploader.pre_sweep_summary
+    if pre_sweep_summary is not None:
+        print("\n--- Pre-sweep Report ---")
+        print(f"  Inspected: {pre_sweep_summary['inspected']}")
+        print(f"  Moved to _junk: {pre_sweep_summary['moved']}")
+        if pre_sweep_summary["errors"] > 0:
+            print(f"  Errors: {pre_sweep_summary['errors']}")
+        print("------------------------\n")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,27 @@
 """Async uploader for FIT files to Strava using aiohttp."""
 import asyncio
+import json
 import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+
+try:
+    # C-level JSON parse/encode; worthwhile once reports reach thousands
+    # of entries and every 201 body goes through it
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    # libuv-backed event loop: noticeably faster at scheduling the
+    # concurrent POSTs and poll coroutines than the stock selector loop.
+    # Not published for Windows, so the import guard doubles as the
+    # platform check.
+    import uvloop
+except ImportError:
+    uvloop = None
 from typing import Dict, Any
 
 import aiohttp
@@ -9,12 +29,48 @@ from tqdm.asyncio import tqdm
 
 from .config import AppConfig
 from .auth import StravaAuth
+from .enums import UploadResult
 from .limiter import AsyncRateLimiter
 from .poller import UploadPoller
+from .seen_cache import SeenCache, hash_fit
+from .token_store import FileTokenStore
 
 logger = logging.getLogger(__name__)
 
 
+def _json_loads(data):
+    """Parse JSON bytes/str with orjson when available."""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Encode to compact JSON bytes with orjson when available."""
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _parse_retry_after(value) -> float | None:
+    """Parse a Retry-After header value into seconds.
+
+    Handles both RFC 7231 forms: delta-seconds and an HTTP-date (which
+    proxies are allowed to substitute). Returns None if unparseable.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+
+
 class AsyncStravaUploader:
     """Async uploader for FIT files to Strava using OAuth tokens."""
 
@@ -25,40 +81,254 @@ class AsyncStravaUploader:
         self.config = config
         token_file = config.token_file or (Path.cwd() / ".strava_tokens.json")
         # Create TokenStore for token persistence
-        from .token_store import FileTokenStore
         token_store = FileTokenStore(Path(token_file))
         self.auth = StravaAuth(config.client_id, config.client_secret, config.auth_code, token_store=token_store)
-        self.limiter = AsyncRateLimiter()
-        self.upload_stats = {"total": 0, "success": 0, "duplicate": 0, "failed": 0, "retries": 0}
+        # Rate-limit counters live next to the token file so back-to-back
+        # runs inside one 15-minute window share the budget
+        self.limiter = AsyncRateLimiter(state_file=Path(token_file).with_name(".strava_ratelimit.json"))
+        self.upload_stats = {"total": 0, "success": 0, "duplicate": 0, "local_duplicate": 0, "cached": 0, "failed": 0, "retries": 0}
         # list of processed files for after-action report
         self.processed: list[dict] = []
+        # Summary of the streamed pre-sweep, when run_async ran one
+        self.pre_sweep_summary: Dict[str, Any] | None = None
+        # Settled outcomes dispatch through this table: one
+        # classification into UploadResult, one dict hop to the handler
+        self._result_handlers = {
+            UploadResult.SUCCESS: self._on_created,
+            UploadResult.DUPLICATE: self._on_duplicate,
+            UploadResult.FAILED: self._on_failed,
+        }
         self._pbar: tqdm | None = None
+        self._pending_ticks = 0
+        # Built once: a ClientTimeout is immutable and aiohttp only reads
+        # from it, so allocating one per upload was pure overhead
+        self._upload_timeout = aiohttp.ClientTimeout(total=60)
+        # Auth header dict is reused across uploads and rebuilt only when
+        # the token nears expiry or a 401 invalidates it; the lock ensures
+        # a single worker performs the refresh
+        self._headers: Dict[str, str] = {}
+        self._cached_exp = 0
+        self._auth_lock = asyncio.Lock()
+        # Paths that already burned their one post-401 refresh; a second
+        # 401 for the same file fails it instead of looping forever
+        self._auth_retries: dict[str, int] = {}
+        # Content digest -> first path seen, for skipping in-batch duplicates
+        self._seen_hashes: dict[str, Path] = {}
+        # Cross-run digest cache (opened per run, next to the FIT folder)
+        # plus the digest of each file currently in flight, so settled
+        # outcomes can be recorded against content rather than paths
+        self._seen_cache: SeenCache | None = None
+        self._digest_of: dict[str, str] = {}
+        # Unlinks and moves are queued here and applied by a single
+        # background worker instead of inline in the upload path
+        self._cleanup_q: asyncio.Queue | None = None
+        # Upload slots: a counter guarded by a Condition rather than a
+        # Semaphore, because a Semaphore cannot be resized safely and a
+        # 429 should temporarily squeeze concurrency down to one
+        self._active_slots = 0
+        self._slot_limit = 0
+        self._target_slots = 0
+        self._slots_cv: asyncio.Condition | None = None
+        self._backoffs = 0
+        # Shared ClientSession, created lazily and reused across runs on
+        # the same loop so warm connections survive between invocations
+        self._session: aiohttp.ClientSession | None = None
+
+    async def _get_session(self, max_concurrent: int = 5) -> aiohttp.ClientSession:
+        """Return the shared ClientSession, creating it on first use.
+
+        Cap connections explicitly: the default connector allows 100 to a
+        single host, which can burst well past our worker count and
+        Strava's rate limits. Keep-alive and DNS caching reuse warm
+        connections instead of paying a TLS handshake per upload.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=max_concurrent * 2,
+                limit_per_host=max_concurrent,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def aclose(self) -> None:
+        """Close the shared session; call once when the uploader is done."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _auth_headers(self) -> Dict[str, str]:
+        """Return the cached Authorization headers, refreshing when needed.
+
+        The common path is a dict read plus one time.time() call, with no
+        disk I/O. When the token is within 60s of expiry or a 401 cleared
+        the cache, exactly one coroutine refreshes over the shared aiohttp
+        session while the rest wait on the lock and then reuse the fresh
+        header.
+        """
+        if self._headers and self._cached_exp - time.time() > 60:
+            return self._headers
+        async with self._auth_lock:
+            if not self._headers or self._cached_exp - time.time() <= 60:
+                token = await self.auth.ensure_token_async(await self._get_session())
+                self._headers = {"Authorization": f"Bearer {token}"}
+                self._cached_exp = self.auth.token.expires_at if self.auth.token else 0
+        return self._headers
+
+    @staticmethod
+    def _build_form(payload, name: str) -> aiohttp.FormData:
+        """Build the multipart body for one upload.
+
+        The FormData itself must be fresh per request (each needs its own
+        boundary), but the field layout lives here so the hot path only
+        supplies the payload.
+        """
+        form = aiohttp.FormData()
+        form.add_field("data_type", "fit")
+        form.add_field("file", payload, filename=name, content_type="application/octet-stream")
+        return form
 
-    async def _move_to_failed(self, fit_path: Path):
-        """Move a failed upload to the _failed folder."""
-        if not fit_path.exists():
-            # File already gone (system/antivirus moved it)
+    def _tick(self, n: int = 1) -> None:
+        """Record progress, flushing to tqdm in batches.
+
+        tqdm takes a lock and re-renders on every update; batching 16
+        ticks at a time amortizes that for large runs of small files.
+        """
+        # Identity check: tqdm's __bool__ raises before a total is set,
+        # and ticks can arrive while the scan is still counting
+        if self._pbar is None:
+            return
+        self._pending_ticks += n
+        if self._pending_ticks >= 16:
+            self._pbar.update(self._pending_ticks)
+            self._pending_ticks = 0
+
+    def _flush_ticks(self) -> None:
+        """Push any batched progress ticks to the bar."""
+        if self._pbar is not None and self._pending_ticks:
+            self._pbar.update(self._pending_ticks)
+            self._pending_ticks = 0
+
+    def _record(self, status: str, fit_path: Path, upload_id=None, activity_id=None, reason=None, **extra) -> None:
+        """Append one entry to the after-action report.
+
+        list.append cannot fail here, so this replaces the repeated
+        try/append/except-pass blocks that each set up exception frames
+        in the hot path.
+        """
+        entry = {"file": str(fit_path), "status": status, "upload_id": upload_id, "activity_id": activity_id}
+        if reason:
+            entry["reason"] = reason
+        if extra:
+            entry.update(extra)
+        self.processed.append(entry)
+
+    def _mark_seen(self, fit_path: Path, status: str, activity_id=None) -> None:
+        """Record a settled outcome for the file's content digest.
+
+        Marked digests short-circuit future runs before the upload POST.
+        The digest was stashed by _upload_single; a miss just means the
+        file never made it through the hashing step this run.
+        """
+        if self._seen_cache is None:
             return
+        digest = self._digest_of.pop(str(fit_path), None)
+        if digest:
+            self._seen_cache.mark(digest, status, activity_id)
+
+    async def _acquire_slot(self) -> None:
+        """Wait for an upload slot under the current concurrency limit."""
+        async with self._slots_cv:
+            await self._slots_cv.wait_for(lambda: self._active_slots < self._slot_limit)
+            self._active_slots += 1
+
+    async def _release_slot(self) -> None:
+        """Return an upload slot and wake one waiter."""
+        async with self._slots_cv:
+            self._active_slots -= 1
+            self._slots_cv.notify(1)
+
+    async def _set_slot_limit(self, limit: int) -> None:
+        """Retune the concurrency limit mid-run.
+
+        Growing wakes all waiters so they re-check against the new
+        limit; shrinking just lets in-flight uploads drain down to it.
+        """
+        async with self._slots_cv:
+            self._slot_limit = limit
+            self._slots_cv.notify_all()
 
-        failed_dir = self.config.fit_folder / "_failed"
-        failed_dir.mkdir(exist_ok=True)
-        try:
-            dest = failed_dir / fit_path.name
-            fit_path.replace(dest)
-            logger.debug(f"Moved failed file to {dest}")
-        except FileNotFoundError:
-            # File disappeared between check and move
-            pass
-        except Exception:
-            logger.debug(f"Could not move {fit_path} to _failed (likely already processed)")
+    def _queue_cleanup(self, action: str, fit_path: Path, dest_dir: Path | None = None) -> None:
+        """Hand a filesystem action to the background cleanup worker.
+
+        put_nowait on the unbounded queue keeps unlink/rename syscalls
+        off the upload critical path entirely; the single worker batches
+        the filesystem pressure instead of N workers each paying it at
+        their moment of success.
+        """
+        self._cleanup_q.put_nowait((action, fit_path, dest_dir))
+
+    def _move_to_failed(self, fit_path: Path) -> None:
+        """Queue a failed upload for a move to the _failed folder."""
+        # _setup_folders already created _failed
+        self._queue_cleanup("move", fit_path, self._failed_dir)
 
-    async def _poll_upload_status(self, session: aiohttp.ClientSession, upload_id: int) -> Dict[str, Any]:
-        """Legacy per-worker poll helper kept for compatibility.
+    async def _cleanup_worker(self) -> None:
+        """Drain queued unlinks and moves on a worker thread, one at a time.
 
-        The uploader now uses a centralized UploadPoller; this helper is
-        retained unused to avoid breaking callers that may depend on it.
+        A None sentinel stops the loop; run_async joins the queue first
+        so every queued action lands before the run returns. Cleanup
+        failures are tolerated the same way the old inline calls were:
+        an already-gone file is not an error here.
         """
-        return {"id": upload_id, "status": "not_polled"}
+        while (item := await self._cleanup_q.get()) is not None:
+            action, fit_path, dest_dir = item
+            try:
+                if action == "unlink":
+                    await asyncio.to_thread(fit_path.unlink, missing_ok=True)
+                    logger.debug(f"Deleted file: {fit_path.name}")
+                else:
+                    await asyncio.to_thread(fit_path.replace, dest_dir / fit_path.name)
+                    logger.debug(f"Moved {fit_path.name} to {dest_dir}")
+            except FileNotFoundError:
+                # File disappeared between queueing and the move
+                pass
+            except Exception:
+                logger.debug(f"Cleanup {action} failed for {fit_path} (likely already processed)")
+            finally:
+                self._cleanup_q.task_done()
+        self._cleanup_q.task_done()
+
+    @staticmethod
+    def _classify_result(final_status: Dict[str, Any]) -> UploadResult:
+        """Map a settled upload-status body onto an UploadResult."""
+        if final_status.get("activity_id"):
+            return UploadResult.SUCCESS
+        if "duplicate" in str(final_status.get("status") or "").lower():
+            return UploadResult.DUPLICATE
+        return UploadResult.FAILED
+
+    def _on_created(self, fit_path: Path, upload_id, activity_id, status) -> None:
+        self.upload_stats["success"] += 1
+        logger.info(f"✓ Upload successful: {fit_path.name} → activity_id={activity_id}, upload_id={upload_id}")
+        self._record("created", fit_path, upload_id, activity_id)
+        self._mark_seen(fit_path, "created", activity_id)
+        self._queue_cleanup("unlink", fit_path)
+
+    def _on_duplicate(self, fit_path: Path, upload_id, activity_id, status) -> None:
+        self.upload_stats["duplicate"] += 1
+        logger.info(f"⊗ Duplicate detected: {fit_path.name} (upload_id={upload_id})")
+        self._record("duplicate", fit_path, upload_id, activity_id)
+        self._mark_seen(fit_path, "duplicate")
+        self._queue_cleanup("unlink", fit_path)
+
+    def _on_failed(self, fit_path: Path, upload_id, activity_id, status) -> None:
+        # Log all failure statuses to file only (not terminal)
+        logger.info(f"✗ Upload failed: {fit_path.name} | Status: {status} | upload_id={upload_id}")
+        self.upload_stats["failed"] += 1
+        self._record("failed", fit_path, upload_id, activity_id, reason=status)
+        self._move_to_failed(fit_path)
 
     async def _process_upload_status(self, fit_path: Path, final_status: Dict[str, Any]):
         """Process the final status of an upload and move the file accordingly."""
@@ -66,44 +336,8 @@ class AsyncStravaUploader:
         status = final_status.get("status") or ""
         upload_id = final_status.get("id") or final_status.get("upload_id")
         activity_id = final_status.get("activity_id")
-
-        if activity_id:
-            self.upload_stats["success"] += 1
-            logger.info(f"✓ Upload successful: {fit_path.name} → activity_id={activity_id}, upload_id={upload_id}")
-            try:
-                self.processed.append({"file": str(fit_path), "status": "created", "upload_id": upload_id, "activity_id": activity_id})
-            except Exception:
-                pass
-            # Silently try to delete; file may already be gone
-            try:
-                if fit_path.exists():
-                    fit_path.unlink()
-                    logger.debug(f"Deleted uploaded file: {fit_path.name}")
-            except Exception as e:
-                logger.debug(f"Could not delete {fit_path.name}: {e}")
-        elif "duplicate" in str(status).lower():
-            self.upload_stats["duplicate"] += 1
-            logger.info(f"⊗ Duplicate detected: {fit_path.name} (upload_id={upload_id})")
-            try:
-                self.processed.append({"file": str(fit_path), "status": "duplicate", "upload_id": upload_id, "activity_id": activity_id})
-            except Exception:
-                pass
-            # Silently try to delete; file may already be gone
-            try:
-                if fit_path.exists():
-                    fit_path.unlink()
-                    logger.debug(f"Deleted duplicate file: {fit_path.name}")
-            except Exception as e:
-                logger.debug(f"Could not delete duplicate {fit_path.name}: {e}")
-        else:
-            # Log all failure statuses to file only (not terminal)
-            logger.info(f"✗ Upload failed: {fit_path.name} | Status: {status} | upload_id={upload_id}")
-            self.upload_stats["failed"] += 1
-            try:
-                self.processed.append({"file": str(fit_path), "status": "failed", "upload_id": upload_id, "activity_id": activity_id, "reason": status})
-            except Exception:
-                pass
-            await self._move_to_failed(fit_path)
+        handler = self._result_handlers[self._classify_result(final_status)]
+        handler(fit_path, upload_id, activity_id, status)
 
     async def _handle_upload_response(
         self, resp_obj: Dict[str, Any], fit_path: Path
@@ -112,11 +346,22 @@ class AsyncStravaUploader:
         status_code = resp_obj.get("status_code")
         headers = resp_obj.get("headers", {})
         body = resp_obj.get("body", {})
-        
+
+        if status_code != 401 and self._auth_retries:
+            # Any other outcome means the refreshed token worked; forget
+            # the marker so a genuine expiry hours later gets its own
+            # refresh instead of failing the file outright
+            self._auth_retries.pop(str(fit_path), None)
+
         if status_code == 201:
             upload_id = body.get("id")
-            # Enqueue to centralized poller for status checks
-            if hasattr(self, "_poller") and self._poller is not None:
+            # Strava sometimes settles the upload synchronously and the
+            # 201 body already carries the activity_id (or a duplicate
+            # status); every poll round-trip is pure overhead then
+            if body.get("activity_id") or body.get("error") or "duplicate" in str(body.get("status", "")).lower():
+                await self._process_upload_status(fit_path, body)
+            # Otherwise enqueue to centralized poller for status checks
+            elif hasattr(self, "_poller") and self._poller is not None:
                 async def _cb(fp, status):
                     # Ensure we pass a Path to the original processor
                     await self._process_upload_status(Path(fp), status)
@@ -128,222 +373,450 @@ class AsyncStravaUploader:
         elif status_code == 409:  # Duplicate
             self.upload_stats["duplicate"] += 1
             logger.info(f"⊗ Duplicate at upload: {fit_path.name}")
-            if fit_path.exists():
-                fit_path.unlink()
-                logger.debug(f"Deleted duplicate: {fit_path.name}")
+            self._mark_seen(fit_path, "duplicate")
+            self._queue_cleanup("unlink", fit_path)
+        elif status_code == 401:  # Token expired mid-run
+            key = str(fit_path)
+            if self._auth_retries.get(key):
+                # Second 401 for this file with a freshly refreshed
+                # token: the credential itself is bad (revoked, wrong
+                # scope), so retrying again can never succeed. Fail the
+                # file so the run terminates.
+                self._auth_retries.pop(key, None)
+                logger.error(f"✗ 401 persists after token refresh: {fit_path.name}")
+                self._on_failed(fit_path, None, None, "unauthorized")
+                return False
+            self._auth_retries[key] = 1
+            # Dropping the cached header alone is not enough: the auth
+            # helper's own lifetime math still considers the token good
+            # and would hand the same rejected bearer straight back.
+            # Invalidate under the auth lock so exactly one worker does
+            # the subsequent refresh.
+            async with self._auth_lock:
+                self._headers = {}
+                self._cached_exp = 0
+                self.auth.invalidate()
+            logger.info(f"⚠ 401 for {fit_path.name}; refreshing token and re-queueing")
+            return True
         elif status_code == 429:  # Rate limited
             # When rate limited, prefer to use Retry-After header if provided
             ra = headers.get("Retry-After") or headers.get("retry-after")
-            ra_val = None
-            if ra:
-                try:
-                    ra_val = float(ra)
-                except Exception:
-                    ra_val = None
-            if self._pbar:
+            ra_val = _parse_retry_after(ra)
+            if self._pbar is not None:
                 self._pbar.set_description("Rate limited. Re-queueing...")
             logger.info(f"⚠ Rate limit 429 for {fit_path.name} | Retry-After: {ra_val or 'not specified'}")
-            await self.limiter.force_backoff(ra_val)
+            # Squeeze concurrency to a single slot while any backoff is
+            # active; the last one to finish restores the target so a
+            # fresh 429 is not met with a full burst of workers
+            self._backoffs += 1
+            await self._set_slot_limit(1)
+            try:
+                await self.limiter.force_backoff(ra_val)
+            finally:
+                self._backoffs -= 1
+                if self._backoffs == 0:
+                    await self._set_slot_limit(self._target_slots)
             return True  # Retry
         else:
-            # Unexpected status code
-            if status_code and status_code >= 400:
-                logger.error(f"Upload failed with status {status_code} for {fit_path.name}")
+            # Unexpected status (unhandled 4xx, 5xx, transport error):
+            # route it through _on_failed so the file lands in _failed
+            # with the stats instead of stranding in _processing with a
+            # log line as its only trace
+            logger.error(f"Upload failed with status {status_code} for {fit_path.name}")
+            self._on_failed(fit_path, None, None, f"http_{status_code}")
         return False
 
     async def _upload_single(
         self, fit_path: Path, queue: asyncio.Queue, session: aiohttp.ClientSession
     ):
-        """Uploads a single file and re-queues on rate limit."""
-        if not fit_path.exists():
-            logger.info(f"File disappeared before upload: {fit_path.name}")
-            if self._pbar:
-                self._pbar.update(1)
-            return
-
+        """Uploads a single file; returns True if re-queued on rate limit."""
         try:
-            await self.limiter.acquire()
-            token = self.auth.ensure_token()
-            headers = {"Authorization": f"Bearer {token}"}
-            
-            logger.info(f"→ Uploading: {fit_path.name}")
-            
-            # Read file content into memory and close the handle immediately
+            # Hash via mmap before touching the caches: files rejected by
+            # the seen-cache or in-batch dedup are never read into RAM
             try:
-                with fit_path.open("rb") as f:
-                    fit_content = f.read()
-                logger.debug(f"Read {len(fit_content)} bytes from {fit_path.name}")
+                digest = await asyncio.to_thread(hash_fit, fit_path)
             except FileNotFoundError:
                 logger.info(f"File disappeared before upload: {fit_path.name}")
-                if self._pbar:
-                    self._pbar.update(1)
+                self._tick()
                 return
 
-            data = aiohttp.FormData()
-            data.add_field("data_type", "fit")
-            data.add_field("file", fit_content, filename=fit_path.name, content_type="application/octet-stream")
-
-            # Add 60-second timeout to prevent stuck uploads
-            timeout = aiohttp.ClientTimeout(total=60)
-            resp = await session.post(self.UPLOAD_URL, headers=headers, data=data, timeout=timeout)
-            
-            logger.info(f"← Response for {fit_path.name}: HTTP {resp.status}")
-            
-            # Parse response and convert to normalized dict for handler
-            resp_dict = {
-                "status_code": resp.status,
-                "headers": resp.headers,
-                "body": await resp.json() if resp.status == 201 else {},
-            }
-            
-            if resp.status == 201 and resp_dict["body"]:
-                logger.debug(f"Upload response body for {fit_path.name}: {resp_dict['body']}")
-            
-            # Update rate limits from response headers
-            self.limiter.update_limits(dict(resp.headers))
-            
-            retry_needed = await self._handle_upload_response(resp_dict, fit_path)
+            self._digest_of[str(fit_path)] = digest
+
+            # A digest that settled as created/duplicate in a past run
+            # will 409 again; skip the POST entirely and drop the file
+            if self._seen_cache is not None:
+                hit = self._seen_cache.lookup(digest)
+                if hit and hit[0] in SeenCache.SKIP_STATUSES:
+                    self.upload_stats["cached"] += 1
+                    logger.info(f"⊗ Already on Strava (cached): {fit_path.name}")
+                    self._record("cached", fit_path, activity_id=hit[1], reason=hit[0])
+                    self._queue_cleanup("unlink", fit_path)
+                    self._tick()
+                    return
+
+            # Strava answers 409 only after the full POST, so an in-batch
+            # duplicate caught here saves bandwidth and a rate-limit token.
+            # Mapping digest -> first path keeps a rate-limit retry of the
+            # same file from matching itself. Check-then-add has no await
+            # between them, so it is atomic on the event loop without a lock.
+            first = self._seen_hashes.setdefault(digest, fit_path)
+            if first != fit_path:
+                self.upload_stats["local_duplicate"] += 1
+                logger.info(f"⊗ Local duplicate: {fit_path.name} matches {first.name}; moving to _junk")
+                self._record("local_duplicate", fit_path, duplicate_of=str(first))
+                self._queue_cleanup("move", fit_path, self._junk_dir)
+                self._tick()
+                return
+
+            # Only files that survived both dedup checks are worth
+            # reading; the bytes come straight from the page cache the
+            # hashing pass just warmed
+            try:
+                payload = await asyncio.to_thread(fit_path.read_bytes)
+            except FileNotFoundError:
+                logger.info(f"File disappeared before upload: {fit_path.name}")
+                self._tick()
+                return
+
+            # The slot gate only covers the network stage, so while N
+            # uploads are in flight the other workers keep hashing and
+            # dedup-checking off-thread: the pipeline overlaps local I/O
+            # with the POSTs instead of paying them sequentially
+            await self._acquire_slot()
+            try:
+                await self.limiter.acquire()
+                headers = await self._auth_headers()
+
+                logger.info(f"→ Uploading: {fit_path.name}")
+
+                data = self._build_form(payload, fit_path.name)
+                # 60-second total timeout prevents stuck uploads
+                resp = await session.post(self.UPLOAD_URL, headers=headers, data=data, timeout=self._upload_timeout)
+
+                logger.info(f"← Response for {fit_path.name}: HTTP {resp.status}")
+
+                # Only a 201 body is ever used (for the upload id). On the
+                # other statuses, releasing without reading hands the
+                # connection back to the pool immediately, before the backoff
+                # or re-queue logic runs, so another worker can reuse it
+                if resp.status == 201:
+                    body = _json_loads(await resp.read())
+                    if body:
+                        logger.debug(f"Upload response body for {fit_path.name}: {body}")
+                else:
+                    resp.release()
+                    body = {}
+
+                # Normalized dict for the handler
+                resp_dict = {
+                    "status_code": resp.status,
+                    "headers": resp.headers,
+                    "body": body,
+                }
+
+                # Update rate limits from response headers; the limiter only
+                # does keyed .get() lookups, so the CIMultiDictProxy is passed
+                # as-is instead of copying 10-30 headers into a dict per upload
+                self.limiter.update_limits(resp.headers)
+
+                retry_needed = await self._handle_upload_response(resp_dict, fit_path)
+            finally:
+                await self._release_slot()
             if retry_needed:
                 self.upload_stats["retries"] += 1
                 logger.info(f"↻ Re-queuing {fit_path.name} for retry (rate limited)")
                 await queue.put(fit_path)  # Re-add to the queue for retry
-            else:
-                if self._pbar:
-                    self._pbar.update(1)
+                return True
+            self._tick()
 
         except asyncio.TimeoutError:
             logger.error(f"✗ Upload timeout (60s) for {fit_path.name}")
             self.upload_stats["failed"] += 1
-            await self._move_to_failed(fit_path)
-            if self._pbar:
-                self._pbar.update(1)
+            self._move_to_failed(fit_path)
+            self._tick()
         except aiohttp.ClientError as e:
             logger.error(f"✗ Network error uploading {fit_path.name}: {e}")
             self.upload_stats["failed"] += 1
-            await self._move_to_failed(fit_path)
-            if self._pbar:
-                self._pbar.update(1)
+            self._move_to_failed(fit_path)
+            self._tick()
         except Exception as e:
             logger.error(f"✗ Unexpected error uploading {fit_path.name}: {e}")
             self.upload_stats["failed"] += 1
-            await self._move_to_failed(fit_path)
-            if self._pbar:
-                self._pbar.update(1)
+            self._move_to_failed(fit_path)
+            self._tick()
 
 
-    async def _worker(self, name: str, queue: asyncio.Queue, session: aiohttp.ClientSession):
-        """Worker task that consumes from the queue."""
-        while True:
-            fit_path = await queue.get()
-            try:
-                await self._upload_single(fit_path, queue, session)
-            finally:
-                queue.task_done()
-
     def _setup_folders(self):
-        """Create necessary subdirectories if they don't exist."""
-        (self.config.fit_folder / "_failed").mkdir(exist_ok=True)
-        (self.config.fit_folder / "_junk").mkdir(exist_ok=True)
-        (self.config.fit_folder / "_processing").mkdir(exist_ok=True)
+        """Create necessary subdirectories if they don't exist.
 
-    async def run_async(self, max_concurrent: int = 5):
-        """Runs the async uploader with a queue and worker pattern."""
+        The Paths are kept as attributes so the per-file branches reuse
+        them instead of re-joining fit_folder with a literal each time.
+        """
+        self._failed_dir = self.config.fit_folder / "_failed"
+        self._junk_dir = self.config.fit_folder / "_junk"
+        self._processing_dir = self.config.fit_folder / "_processing"
+        self._failed_dir.mkdir(exist_ok=True)
+        self._junk_dir.mkdir(exist_ok=True)
+        self._processing_dir.mkdir(exist_ok=True)
+
+    async def run_async(self, max_concurrent: int = 5, pre_sweep=None):
+        """Runs the async uploader with semaphore-bounded upload tasks.
+
+        ``pre_sweep`` is an optional callable taking an ``on_keep``
+        callback (see cleaner.pre_sweep_move_junk). When given, the
+        sweep runs on a thread alongside the uploads and its keep
+        verdicts feed the work queue directly, so the first POST goes
+        out while the tail of the folder is still being inspected
+        instead of after it. The sweep's summary lands in
+        ``self.pre_sweep_summary``.
+        """
         folder = self.config.fit_folder
-        
-        # Get all FIT files, filtering out special directories
-        all_fits = sorted(list(folder.glob("*.fit")) + list(folder.glob("*.FIT")))
-        fits_to_upload = [f for f in all_fits if f.exists() and f.parent == folder]
-        
-        # Double-check: exclude files in _junk, _failed, _processing subdirs
-        fits_to_upload = [f for f in fits_to_upload if f.parent.name not in ("_junk", "_failed", "_processing")]
-
-        if not fits_to_upload:
-            print("No new FIT files to upload.")
-            logger.info("No FIT files found in main directory")
-            return
-
-        self.upload_stats["total"] = len(fits_to_upload)
-        print(f"Found {len(fits_to_upload)} FIT files to upload.")
-        logger.info(f"Starting upload session: {len(fits_to_upload)} files queued")
-
-        queue: asyncio.Queue[Path] = asyncio.Queue()
-        for fit in fits_to_upload:
-            await queue.put(fit)
-
-        async with aiohttp.ClientSession() as session:
-            # Start centralized poller
-            poller = UploadPoller(self.auth, self.limiter, session, self.UPLOAD_STATUS_URL)
-            self._poller = poller
-            poller.start()
 
-            with tqdm(total=len(fits_to_upload), desc="Uploading FIT files") as pbar:
-                self._pbar = pbar
-                tasks = [
-                    asyncio.create_task(self._worker(f"worker-{i}", queue, session))
-                    for i in range(min(max_concurrent, len(fits_to_upload)))
-                ]
+        # The sweep streams surviving paths into this queue from its
+        # own thread; call_soon_threadsafe hops them onto the loop and
+        # the None sentinel marks the stream complete
+        feed: asyncio.Queue | None = None
+        sweep_task = None
+        self.pre_sweep_summary = None
+        if pre_sweep is not None:
+            feed = asyncio.Queue()
+            loop = asyncio.get_running_loop()
 
-                await queue.join()  # Wait for all files to be processed
+            def _on_keep(path_str: str) -> None:
+                loop.call_soon_threadsafe(feed.put_nowait, path_str)
 
-                # Wait for poller to finish processing any pending status checks
-                await poller.stop()
-
-                for task in tasks:
-                    task.cancel()
-                await asyncio.gather(*tasks, return_exceptions=True)
+            async def _run_sweep():
+                try:
+                    self.pre_sweep_summary = await asyncio.to_thread(pre_sweep, _on_keep)
+                except Exception:
+                    # Files the sweep never reached stay put for the
+                    # next run; what was already fed still uploads
+                    logger.exception("Pre-sweep failed; uploading the files it vetted so far")
+                finally:
+                    feed.put_nowait(None)
+
+            sweep_task = asyncio.create_task(_run_sweep())
+
+        # Create the special folders once up front so per-file paths never
+        # need a mkdir(exist_ok=True) in the hot path
+        self._setup_folders()
+
+        # Digest cache of past created/duplicate outcomes; loaded once so
+        # hot-path lookups never touch sqlite
+        self._seen_cache = SeenCache(folder)
+
+        # The cleanup worker outlives the TaskGroup because poller
+        # callbacks keep queueing unlinks until poller.stop() returns
+        self._cleanup_q = asyncio.Queue()
+        cleanup_task = asyncio.create_task(self._cleanup_worker())
+
+        session = await self._get_session(max_concurrent)
+        # Start centralized poller
+        poller = UploadPoller(self.auth, self.limiter, session, self.UPLOAD_STATUS_URL, headers_cb=self._auth_headers)
+        self._poller = poller
+        poller.start()
+
+        # The slot gate bounds in-flight uploads (and can be retuned on
+        # 429); the bounded work queue keeps memory constant regardless
+        # of folder size and lets the first upload start before the
+        # directory scan finishes
+        self._active_slots = 0
+        self._slot_limit = self._target_slots = max_concurrent
+        self._slots_cv = asyncio.Condition()
+        self._backoffs = 0
+        work_queue: asyncio.Queue = asyncio.Queue(maxsize=128)
+        retry_queue: asyncio.Queue = asyncio.Queue()
+        unsettled = 0
+        scan_done = False
+
+        def _maybe_stop_drainer():
+            if scan_done and unsettled == 0:
+                retry_queue.put_nowait(None)
+
+        with tqdm(desc="Uploading FIT files", unit="file") as pbar:
+            self._pbar = pbar
+
+            # The TaskGroup owns every task: an unexpected exception in
+            # one upload cancels the rest and propagates, instead of
+            # leaking orphan tasks the old manual wait loop could miss
+            async with asyncio.TaskGroup() as tg:
+
+                async def _one_file(fp: Path):
+                    # _upload_single takes the slot gate itself, around
+                    # just the network stage
+                    nonlocal unsettled
+                    requeued = await self._upload_single(fp, retry_queue, session)
+                    if not requeued:
+                        unsettled -= 1
+                        _maybe_stop_drainer()
+
+                async def _worker():
+                    while (fp := await work_queue.get()) is not None:
+                        await _one_file(fp)
+
+                async def _scan():
+                    # One scandir pass over the top level replaces the
+                    # old glob-then-sort, which materialized every entry
+                    # before the first upload could start; scandir never
+                    # recurses, so _junk/_failed/_processing are
+                    # excluded by construction. The bounded put() is the
+                    # backpressure: scanning pauses while workers catch
+                    # up.
+                    # Each candidate is atomically renamed into
+                    # _processing before it is enqueued, so a second
+                    # concurrent or restarted run scanning the same
+                    # folder can never pick up a file this run owns.
+                    nonlocal unsettled, scan_done
+                    staging = self._processing_dir
+                    found = 0
+
+                    def _claim(src: str, dst: Path) -> bool:
+                        # os.replace would silently clobber an existing
+                        # _processing/<name> — typically a rescued orphan
+                        # whose upload task has yet to read its bytes —
+                        # so a name collision leaves the newcomer in the
+                        # main folder for the next run instead
+                        if os.path.exists(dst):
+                            return False
+                        os.replace(src, dst)
+                        return True
+
+                    async def _stage(src: str, name: str) -> None:
+                        nonlocal found, unsettled
+                        staged = staging / name
+                        try:
+                            if not await asyncio.to_thread(_claim, src, staged):
+                                logger.info(f"⊘ {name} already staged from a previous run; deferring newcomer")
+                                return
+                        except OSError:
+                            # Another run claimed it first
+                            return
+                        found += 1
+                        unsettled += 1
+                        self.upload_stats["total"] = found
+                        await work_queue.put(staged)
+
+                    # Files already sitting in _processing were staged by
+                    # an interrupted run and belong to nobody else now;
+                    # without this rescue they are invisible to every
+                    # future scan and the run reports "no new files"
+                    with os.scandir(staging) as it:
+                        for e in it:
+                            if e.is_file(follow_symlinks=False) and e.name.lower().endswith(".fit"):
+                                found += 1
+                                unsettled += 1
+                                self.upload_stats["total"] = found
+                                await work_queue.put(Path(e.path))
+
+                    if feed is not None:
+                        # Streaming mode: the pre-sweep vets the folder
+                        # and only survivors arrive here
+                        while (p := await feed.get()) is not None:
+                            await _stage(p, os.path.basename(p))
+                    else:
+                        with os.scandir(folder) as it:
+                            for e in it:
+                                if e.is_file(follow_symlinks=False) and e.name.lower().endswith(".fit"):
+                                    await _stage(e.path, e.name)
+                    scan_done = True
+                    pbar.total = found
+                    pbar.refresh()
+                    logger.info(f"Scan complete: {found} files queued")
+                    for _ in range(max_concurrent):
+                        await work_queue.put(None)
+                    _maybe_stop_drainer()
+
+                async def _drain_retries():
+                    # _upload_single enqueues a rate-limited file only
+                    # after its backoff has elapsed, so resubmitting
+                    # here puts the retry right back in flight
+                    while (fp := await retry_queue.get()) is not None:
+                        tg.create_task(_one_file(fp))
+
+                tg.create_task(_drain_retries())
+                tg.create_task(_scan())
+                for _ in range(max_concurrent):
+                    tg.create_task(_worker())
+
+            # Wait for poller to finish processing any pending status checks
+            await poller.stop()
+            self._flush_ticks()
+
+        # Already finished (its sentinel released the scan producer);
+        # awaited so a failure is not silently dropped
+        if sweep_task is not None:
+            await sweep_task
+
+        # Every queued unlink/move must land before the run returns;
+        # then the sentinel releases the worker
+        await self._cleanup_q.join()
+        self._cleanup_q.put_nowait(None)
+        await cleanup_task
+
+        # Commit after the poller has delivered the last outcomes
+        self._seen_cache.close()
+        self._seen_cache = None
+
+        if self.upload_stats["total"] == 0:
+            print("No new FIT files to upload.")
+            logger.info("No FIT files found in main directory")
+            return
 
         self._print_summary()
 
     def _print_summary(self):
         """Prints a summary of the upload session."""
-        import json
-        from datetime import datetime
-
         print("\n--- Upload Report ---")
         print(f"  Total files to process: {self.upload_stats['total']}")
         print(f"  Successfully uploaded: {self.upload_stats['success']}")
         print(f"  Duplicates (already on Strava): {self.upload_stats['duplicate']}")
+        if self.upload_stats["local_duplicate"] > 0:
+            print(f"  Local duplicates (never uploaded): {self.upload_stats['local_duplicate']}")
+        if self.upload_stats["cached"] > 0:
+            print(f"  Skipped via seen-cache (settled in past runs): {self.upload_stats['cached']}")
         print(f"  Failed uploads: {self.upload_stats['failed']}")
         if self.upload_stats["retries"] > 0:
             print(f"  Files re-queued due to rate limits: {self.upload_stats['retries']}")
         print("---------------------\n")
 
-        # Append to single after-action report JSON file
+        # Append the after-action report as one JSONL line. Appending is
+        # O(1) regardless of history size, where the old read-modify-write
+        # of a JSON array re-parsed and rewrote every prior session and
+        # could corrupt the whole file if the process died mid-write.
         try:
-            json_file = "upload_history.json"
+            json_file = "upload_history.jsonl"
             ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-            
+
             # Create new report entry
             report_entry = {
                 "timestamp": ts,
                 "summary": self.upload_stats,
                 "processed": self.processed
             }
-            
-            # Load existing reports or create new list
-            try:
-                with open(json_file, "r", encoding="utf-8") as jf:
-                    history = json.load(jf)
-                    if not isinstance(history, list):
-                        history = []
-            except (FileNotFoundError, json.JSONDecodeError):
-                history = []
-            
-            # Append new report
-            history.append(report_entry)
-            
-            # Write back to file
-            with open(json_file, "w", encoding="utf-8") as jf:
-                json.dump(history, jf, ensure_ascii=False, indent=2)
+
+            with open(json_file, "ab") as jf:
+                jf.write(_json_dumps_bytes(report_entry) + b"\n")
 
             print(f"After-action report appended to: {json_file}")
         except Exception:
             logger.exception("Failed to write after-action report")
 
-    def run(self, max_concurrent: int = 5):
+    def run(self, max_concurrent: int = 5, pre_sweep=None):
         """Runs the uploader synchronously with configurable concurrency."""
+
+        async def _main():
+            # The shared session must be closed on the loop that created
+            # it, so the teardown lives inside asyncio.run
+            try:
+                await self.run_async(max_concurrent=max_concurrent, pre_sweep=pre_sweep)
+            finally:
+                await self.aclose()
+
         try:
-            asyncio.run(self.run_async(max_concurrent=max_concurrent))
+            if uvloop is not None:
+                uvloop.run(_main())
+            else:
+                asyncio.run(_main())
         except KeyboardInterrupt:
             print("\nUpload cancelled by user.")
             # Print summary even when interrupted
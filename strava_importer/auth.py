@@ -3,7 +3,7 @@ import logging
 from pathlib import Path
 from typing import Optional
 
-import requests
+import aiohttp
 
 from .token_store import TokenStore, FileTokenStore, TokenInfo
 
@@ -52,8 +52,45 @@ class StravaAuth:
         
         self.token_store = token_store
         self.token: TokenInfo | None = None
+        # Lazily built requests.Session for the sync token paths; see
+        # _http_session
+        self._http = None
+        # Last time ensure_token confirmed the token was usable; calls
+        # within a second of each other skip even the lifetime math
+        self._last_validated = 0.0
         self._load_from_store()
 
+    def _needs_refresh(self, now: float) -> bool:
+        """True once 80% of the token's lifetime has elapsed.
+
+        Refreshing at a fraction of lifetime instead of a fixed 60s
+        cliff keeps long runs from racing expiry with requests already
+        in flight. Tokens persisted without issued_at fall back to the
+        old 60-second rule.
+        """
+        token = self.token
+        if not token:
+            return False
+        lifetime = token.expires_at - token.issued_at
+        if token.issued_at and lifetime > 0:
+            return now > token.issued_at + 0.8 * lifetime
+        return token.expires_at - now < 60
+
+    def invalidate(self) -> None:
+        """Force the next ensure_token call to refresh.
+
+        Called when the API rejects the current bearer with a 401: by
+        local math the token still looks fine (it has lifetime left and
+        the one-second validation memo is warm), so without this
+        ensure_token would hand back the very same rejected bearer.
+        Aging the token out makes _needs_refresh trip regardless of
+        what the server originally promised.
+        """
+        self._last_validated = 0.0
+        if self.token:
+            self.token.issued_at = 0
+            self.token.expires_at = 0
+
     def _load_from_store(self) -> None:
         try:
             self.token = self.token_store.load()
@@ -71,52 +108,125 @@ class StravaAuth:
         except Exception:
             logger.exception("Failed to save token to store")
 
-    def exchange_code(self) -> TokenInfo:
-        resp = requests.post(self.TOKEN_URL, json={
+    def _exchange_payload(self) -> dict:
+        return {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
             "code": self.auth_code,
             "grant_type": "authorization_code",
-        }, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        }
+
+    def _refresh_payload(self) -> dict:
+        if not self.token or not self.token.refresh_token:
+            raise RuntimeError("No refresh token available")
+        return {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "grant_type": "refresh_token",
+            "refresh_token": self.token.refresh_token,
+        }
+
+    def _apply_exchange(self, data: dict) -> TokenInfo:
+        now = int(time.time())
         token = TokenInfo(
             access_token=data["access_token"],
             refresh_token=data.get("refresh_token"),
-            expires_at=int(time.time()) + int(data.get("expires_in", 0)),
+            expires_at=now + int(data.get("expires_in", 0)),
+            issued_at=now,
         )
         self.token = token
         self._save_to_store()
         logger.info("Exchanged code for access token, expires_at=%s", token.expires_at)
         return token
 
-    def refresh(self) -> TokenInfo:
-        if not self.token or not self.token.refresh_token:
-            raise RuntimeError("No refresh token available")
-        resp = requests.post(self.TOKEN_URL, data={
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "grant_type": "refresh_token",
-            "refresh_token": self.token.refresh_token,
-        }, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+    def _apply_refresh(self, data: dict) -> TokenInfo:
+        now = int(time.time())
         token = TokenInfo(
             access_token=data["access_token"],
             refresh_token=data.get("refresh_token", self.token.refresh_token),
-            expires_at=int(time.time()) + int(data.get("expires_in", 0)),
+            expires_at=now + int(data.get("expires_in", 0)),
+            issued_at=now,
         )
         self.token = token
         self._save_to_store()
         logger.info("Refreshed access token, new expires_at=%s", token.expires_at)
         return token
 
+    def _http_session(self):
+        """Return the shared requests.Session, creating it on first use.
+
+        Bare requests.post builds a fresh adapter and pays a TCP+TLS
+        handshake to strava.com per call; one Session keeps the
+        connection warm across exchange/refresh round-trips. Deferred
+        import: the async paths never touch requests, so it stays off
+        module (and worker-spawn) startup.
+        """
+        if self._http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self._http = session
+        return self._http
+
+    def exchange_code(self) -> TokenInfo:
+        resp = self._http_session().post(self.TOKEN_URL, json=self._exchange_payload(), timeout=30)
+        resp.raise_for_status()
+        return self._apply_exchange(resp.json())
+
+    def refresh(self) -> TokenInfo:
+        resp = self._http_session().post(self.TOKEN_URL, data=self._refresh_payload(), timeout=30)
+        resp.raise_for_status()
+        return self._apply_refresh(resp.json())
+
+    async def exchange_code_async(self, session: aiohttp.ClientSession) -> TokenInfo:
+        """Async variant of exchange_code, reusing the caller's session."""
+        async with session.post(self.TOKEN_URL, json=self._exchange_payload(),
+                                timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        return self._apply_exchange(data)
+
+    async def refresh_async(self, session: aiohttp.ClientSession) -> TokenInfo:
+        """Async variant of refresh, reusing the caller's session."""
+        async with session.post(self.TOKEN_URL, data=self._refresh_payload(),
+                                timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        return self._apply_refresh(data)
+
+    async def ensure_token_async(self, session: aiohttp.ClientSession) -> str:
+        """Async mirror of ensure_token for callers already on the loop.
+
+        Keeps the event loop responsive during the token POST instead of
+        blocking every in-flight upload for the HTTPS round trip.
+        """
+        now = time.time()
+        if self.token and now - self._last_validated < 1.0:
+            return self.token.access_token
+        if not self.token:
+            await self.exchange_code_async(session)
+        if self._needs_refresh(now):
+            try:
+                await self.refresh_async(session)
+            except Exception:
+                logger.exception("Token refresh failed; attempting exchange code")
+                await self.exchange_code_async(session)
+        if not self.token:
+            raise RuntimeError("Failed to obtain token")
+        self._last_validated = now
+        return self.token.access_token
+
     def ensure_token(self) -> str:
+        now = time.time()
+        if self.token and now - self._last_validated < 1.0:
+            return self.token.access_token
         if not self.token:
             # Try to obtain token by exchanging code
             self.exchange_code()
-        # refresh if expiring soon
-        if self.token and self.token.expires_at - int(time.time()) < 60:
+        # refresh once most of the lifetime is spent
+        if self._needs_refresh(now):
             try:
                 self.refresh()
             except Exception:
@@ -124,4 +234,5 @@ class StravaAuth:
                 self.exchange_code()
         if not self.token:
             raise RuntimeError("Failed to obtain token")
+        self._last_validated = now
         return self.token.access_token
\ No newline at end of file
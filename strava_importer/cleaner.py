@@ -14,17 +14,228 @@ Heuristics:
 This module depends on the ``fitparse`` package.
 """
 from pathlib import Path
+import atexit
 import logging
-from typing import Tuple, List, Dict, Any
+import mmap
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Tuple, List, Dict, Any, Optional
 
-from fitparse import FitFile, FitParseError
 from tqdm import tqdm
 
 
 logger = logging.getLogger(__name__)
 
+# Lazy singleton pool, reused across pre-sweep invocations: creating a
+# ProcessPoolExecutor per call pays fork/spawn plus a fitparse import in
+# every worker each time, which dominates for small folders and repeated
+# CLI/test runs
+_POOL: ProcessPoolExecutor | None = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _worker_init() -> None:
+    """Pre-import fitparse in the worker so the first task isn't charged for it."""
+    import fitparse  # noqa: F401
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared inspection pool, (re)creating it on first use or growth."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS < workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False)
+            _POOL = ProcessPoolExecutor(max_workers=workers, initializer=_worker_init)
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def _shutdown_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True)
+        _POOL = None
+
+
+atexit.register(_shutdown_pool)
+
+
+# Just enough of the FIT profile for the junk heuristics: file_id.type
+# values (message 0, field 0) and sport values (message 18, field 5).
+# Unknown numbers fall back to a "type_N"/"sport_N" string, which the
+# substring checks treat as non-activity / non-training.
+_FIT_FILE_TYPES = {
+    1: "device", 2: "settings", 3: "sport", 4: "activity", 5: "workout",
+    6: "course", 7: "schedules", 9: "weight", 10: "totals", 11: "goals",
+    14: "blood_pressure", 15: "monitoring_a", 20: "activity_summary",
+    28: "monitoring_daily", 32: "monitoring_b", 35: "segment",
+    40: "segment_list", 44: "exd_configuration",
+}
+_FIT_SPORTS = {
+    0: "generic", 1: "running", 2: "cycling", 3: "transition",
+    4: "fitness_equipment", 5: "swimming", 10: "training", 26: "hiking",
+    11: "walking",
+}
+
+# Verdict per known file_id type, precomputed so per-file classification
+# is a dict hit instead of a substring scan; unknown "type_N" strings
+# fall back to the substring rule that built the table
+_CLASSIFY = {name: ("keep" if "activity" in name else "move")
+             for name in _FIT_FILE_TYPES.values()}
+
+
+def _classify(ftype_str: str) -> str:
+    return _CLASSIFY.get(ftype_str) or ("keep" if "activity" in ftype_str else "move")
+
+
+def _scan_fit(data) -> Tuple[str | None, str | None, float | None]:
+    """Pull (file type, sport, total_distance) out of raw FIT bytes.
+
+    ``data`` is any bytes-like supporting indexing and slicing (bytes
+    or an mmap). fitparse decodes every record in the file; the heuristics only need
+    the ``file_id`` message and, for activities, the first ``session``
+    summary. This scanner walks record headers and definition messages,
+    decodes just those two messages, and skips everything else by size
+    with no CRC pass. Raises ValueError on anything it cannot follow so
+    the caller can fall back to the full parser.
+    """
+    if len(data) < 12:
+        raise ValueError("truncated header")
+    header_size = data[0]
+    if header_size < 12 or data[8:12] != b".FIT":
+        raise ValueError("not a FIT file")
+    data_size = int.from_bytes(data[4:8], "little")
+    pos = header_size
+    end = min(len(data), header_size + data_size)
+
+    # local message type -> (global message number, payload size,
+    # [(field_def_num, offset, size)], endianness)
+    defs: Dict[int, Tuple[int, int, list, str]] = {}
+    ftype = sport = None
+    distance = None
+    saw_file_id = False
+
+    while pos < end:
+        hdr = data[pos]
+        pos += 1
+        if hdr & 0x80:
+            # Compressed-timestamp data message: payload matches the defs
+            local = (hdr >> 5) & 0x3
+            is_def = False
+        else:
+            local = hdr & 0x0F
+            is_def = bool(hdr & 0x40)
+
+        if is_def:
+            if pos + 5 > end:
+                raise ValueError("truncated definition")
+            endian = "big" if data[pos + 1] else "little"
+            global_num = int.from_bytes(data[pos + 2:pos + 4], endian)
+            nfields = data[pos + 4]
+            pos += 5
+            if pos + 3 * nfields > end:
+                raise ValueError("truncated definition")
+            fields = []
+            total = 0
+            for _ in range(nfields):
+                fdn, size = data[pos], data[pos + 1]
+                fields.append((fdn, total, size))
+                total += size
+                pos += 3
+            if hdr & 0x20:
+                # Developer fields count toward the payload size only
+                if pos >= end:
+                    raise ValueError("truncated definition")
+                ndev = data[pos]
+                pos += 1
+                if pos + 3 * ndev > end:
+                    raise ValueError("truncated definition")
+                for _ in range(ndev):
+                    total += data[pos + 1]
+                    pos += 3
+            defs[local] = (global_num, total, fields, endian)
+            continue
+
+        if local not in defs:
+            raise ValueError(f"data message before definition (local {local})")
+        global_num, total, fields, endian = defs[local]
+        if pos + total > end:
+            break
+
+        if global_num == 0 and not saw_file_id:  # file_id
+            saw_file_id = True
+            for fdn, off, size in fields:
+                if fdn == 0 and size == 1:
+                    v = data[pos + off]
+                    if v != 0xFF:
+                        ftype = _FIT_FILE_TYPES.get(v, f"type_{v}")
+            if ftype is None or "activity" not in ftype:
+                return ftype, sport, distance
+        elif global_num == 18:  # session (written after the records)
+            for fdn, off, size in fields:
+                if fdn == 5 and size == 1:
+                    v = data[pos + off]
+                    if v != 0xFF:
+                        sport = _FIT_SPORTS.get(v, f"sport_{v}")
+                elif fdn == 9 and size == 4:  # total_distance, uint32 cm
+                    v = int.from_bytes(data[pos + off:pos + off + 4], endian)
+                    if v != 0xFFFFFFFF:
+                        distance = v / 100.0
+            return ftype, sport, distance
+        pos += total
+
+    if not saw_file_id:
+        raise ValueError("no file_id message")
+    return ftype, sport, distance
+
 
 def _inspect_fit(path_str: str) -> Tuple[str, str, str]:
+    """Inspect a single FIT file with the minimal scanner.
+
+    Applies the same heuristics as :func:`_inspect_fit_full` but through
+    :func:`_scan_fit`, which skips record decoding and CRC entirely.
+    Files the scanner cannot follow are retried with full fitparse so
+    oddly structured FITs keep their old classification.
+    """
+    try:
+        with open(path_str, "rb") as f:
+            # file_id is the first data message, so 4 KB settles most
+            # files without reading the rest; only activities need the
+            # session summary at the tail, and only then is the full
+            # file worth its I/O
+            head = f.read(4096)
+            try:
+                ftype, sport, distance = _scan_fit(head)
+                need_rest = ftype is None or _classify(ftype) == "keep"
+            except ValueError:
+                need_rest = True
+            if need_rest:
+                # The session summary sits at the record tail, so the
+                # whole file has to be walked; mapping it scans in place
+                # instead of concatenating a second whole-file bytes copy
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    ftype, sport, distance = _scan_fit(mm)
+    except OSError as e:
+        return path_str, "error", str(e)
+    except ValueError:
+        return _inspect_fit_full(path_str)
+
+    if ftype is None:
+        return path_str, "keep", "no_type"
+    if _classify(ftype) == "keep":
+        sport_str = sport or ""
+        if sport_str == "training" or (distance is None and "training" in sport_str):
+            return path_str, "move", f"training_activity:{sport_str}"
+        return path_str, "keep", ftype
+    return path_str, "move", ftype
+
+
+def _inspect_fit_full(path_str: str) -> Tuple[str, str, str]:
     """Inspect a single FIT file to determine whether it should be moved.
 
     This function is safe to run in a separate process (it takes a string
@@ -44,51 +255,63 @@ def _inspect_fit(path_str: str) -> Tuple[str, str, str]:
     Tuple[str, str, str]
         See description above.
     """
+    # Deferred: most files never reach this fallback, so the module (and
+    # each spawned worker) skips the fitparse import cost unless needed
+    from fitparse import FitFile, FitParseError
+
     try:
-        fit = FitFile(path_str)
-        file_id_msgs = list(fit.get_messages("file_id"))
-        if not file_id_msgs:
+        # The CRC pass reads the whole file end to end just to validate
+        # a checksum the heuristics never consult; a corrupt file still
+        # surfaces as a FitParseError when its records fail to decode
+        fit = FitFile(path_str, check_crc=False)
+        # One walk over the decoded stream instead of one get_messages
+        # pass per message name: file_id arrives first, session near the
+        # tail, and the break fires as soon as both are settled
+        ftype = None
+        saw_file_id = False
+        session = None
+        for msg in fit.get_messages(("file_id", "session")):
+            if msg.name == "file_id" and not saw_file_id:
+                saw_file_id = True
+                try:
+                    if hasattr(msg, "get_value"):
+                        ftype = getattr(msg, "get_value")("type")
+                    elif isinstance(msg, dict):
+                        ftype = msg.get("type")
+                except Exception:
+                    ftype = None
+                if ftype is None or _classify(str(ftype).lower()) != "keep":
+                    break
+            elif msg.name == "session" and session is None:
+                session = msg
+                if saw_file_id:
+                    break
+
+        if not saw_file_id:
             return path_str, "keep", "no_file_id"
-
-        file_id = file_id_msgs[0]
-        try:
-            if hasattr(file_id, "get_value"):
-                ftype = getattr(file_id, "get_value")("type")
-            elif isinstance(file_id, dict):
-                ftype = file_id.get("type")
-            else:
-                ftype = None
-        except Exception:
-            ftype = None
-
         if ftype is None:
             return path_str, "keep", "no_type"
 
         ftype_str = str(ftype).lower()
-        if "activity" in ftype_str:
-            try:
-                sessions = list(fit.get_messages("session"))
-                if sessions:
-                    session = sessions[0]
-                    sport = None
-                    distance = None
-                    try:
-                        if hasattr(session, "get_value"):
-                            sport = getattr(session, "get_value")("sport")
-                            distance = getattr(session, "get_value")("total_distance")
-                        elif isinstance(session, dict):
-                            sport = session.get("sport")
-                            distance = session.get("total_distance")
-                    except Exception:
-                        pass
-
-                    sport_str = str(sport).lower() if sport else ""
-                    
-                    if sport_str == "training" or (distance is None and "training" in sport_str):
-                        return path_str, "move", f"training_activity:{sport_str}"
-            except Exception:
-                pass
-            
+        if _classify(ftype_str) == "keep":
+            if session is not None:
+                sport = None
+                distance = None
+                try:
+                    if hasattr(session, "get_value"):
+                        sport = getattr(session, "get_value")("sport")
+                        distance = getattr(session, "get_value")("total_distance")
+                    elif isinstance(session, dict):
+                        sport = session.get("sport")
+                        distance = session.get("total_distance")
+                except Exception:
+                    pass
+
+                sport_str = str(sport).lower() if sport else ""
+
+                if sport_str == "training" or (distance is None and "training" in sport_str):
+                    return path_str, "move", f"training_activity:{sport_str}"
+
             return path_str, "keep", ftype_str
         else:
             return path_str, "move", ftype_str
@@ -99,18 +322,99 @@ def _inspect_fit(path_str: str) -> Tuple[str, str, str]:
         return path_str, "error", str(e)
 
 
-def pre_sweep_move_junk(fit_folder: Path, workers: int | None = None) -> Dict[str, Any]:
+# FIT exports never change once written, so a verdict keyed by
+# (name, mtime_ns, size) stays valid across runs; re-sweeping an already
+# cleaned archive then costs one directory scan instead of re-parsing
+# every survivor. Sqlite sidecar like the uploader's seen-cache: loading
+# tens of thousands of rows is one C-level SELECT instead of a JSON
+# parse allocating a dict entry per verdict.
+CLEANER_CACHE_NAME = ".cleaner_cache.sqlite"
+
+
+def _load_cleaner_cache(fit_folder: Path) -> Dict[str, list]:
+    try:
+        conn = sqlite3.connect(fit_folder / CLEANER_CACHE_NAME)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, action TEXT, reason TEXT)"
+            )
+            return {key: [action, reason]
+                    for key, action, reason in conn.execute("SELECT key, action, reason FROM verdicts")}
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+
+
+def _save_cleaner_cache(fit_folder: Path, cache: Dict[str, list]) -> None:
+    # Full rewrite keeps the eviction semantics: only keys for files
+    # still present survive, so the table never outgrows the folder
+    try:
+        conn = sqlite3.connect(fit_folder / CLEANER_CACHE_NAME)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, action TEXT, reason TEXT)"
+            )
+            conn.execute("DELETE FROM verdicts")
+            conn.executemany(
+                "INSERT INTO verdicts (key, action, reason) VALUES (?, ?, ?)",
+                ((key, action, reason) for key, (action, reason) in cache.items()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        logger.debug("Could not persist cleaner cache in %s", fit_folder)
+
+
+# Garmin names its wellness-style exports after their content; these are
+# never uploadable activities, so the name alone settles them
+_JUNK_NAME_PREFIXES = ("MONITOR", "SETTINGS", "METRICS", "SLEEP", "HRV_STATUS", "WELLNESS")
+
+
+def _quick_classify(entry: os.DirEntry) -> str | None:
+    """Junk reason decidable from the directory entry alone, else None.
+
+    The name check is free; the size check reuses scandir's stat. A
+    file under 1 KiB cannot hold a meaningful activity recording, and
+    anything either test catches skips parsing entirely.
+    """
+    if entry.name.upper().startswith(_JUNK_NAME_PREFIXES):
+        return "name_prefix"
+    size = entry.stat().st_size
+    if size < 1024:
+        return f"undersized:{size}B"
+    return None
+
+
+def pre_sweep_move_junk(fit_folder: Path, workers: int | None = None,
+                        use_processes: bool = False,
+                        on_keep: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
     """Scan ``fit_folder`` and move non-activity files to a ``_junk`` subfolder.
 
-    Files are inspected IN-PLACE to avoid race conditions from multiple
-    move operations happening simultaneously across processes.
+    Files are inspected IN-PLACE across the worker pool; all moves
+    happen here in the parent so no two workers ever race on the same
+    rename.
 
     Parameters
     ----------
     fit_folder: Path
         Path to the folder containing .fit files to inspect.
     workers: Optional[int]
-        Unused (kept for backward compatibility).
+        Number of inspection workers; defaults to the CPU count for
+        processes and a multiple of it for threads.
+    use_processes: bool
+        Inspect on the shared process pool instead of threads. The
+        default is threads: inspection is dominated by file reads (the
+        GIL is released in os.read) and a small decode, so threads skip
+        the fork/spawn and per-task pickling cost entirely.
+    on_keep: Optional[Callable[[str], None]]
+        Called with each surviving file's path as its verdict settles,
+        so a downstream consumer (the uploader) can start on early
+        survivors while the tail of the sweep is still inspecting.
+        Error verdicts count as survivors: files the sweep cannot read
+        stay in place and are the uploader's to judge, same as before.
+        Runs on the sweep's thread and must not block.
 
     Returns
     -------
@@ -125,59 +429,156 @@ def pre_sweep_move_junk(fit_folder: Path, workers: int | None = None) -> Dict[st
     junk_dir = fit_folder / "_junk"
     junk_dir.mkdir(parents=True, exist_ok=True)
 
-    fits_to_process: List[Path] = sorted(fit_folder.glob("*.fit")) + sorted(fit_folder.glob("*.FIT"))
-    # Only include files in the main directory (not in subdirs)
-    fits_to_process = [f for f in fits_to_process if f.exists() and f.parent == fit_folder]
-
-    logger.info(f"Pre-sweep starting: {len(fits_to_process)} files to inspect")
-
-    if not fits_to_process:
-        logger.info("No FIT files found to inspect")
-        return {"inspected": 0, "moved": 0, "errors": 0}
-
-    inspected = 0
-    moved = 0
+    # One scandir pass replaces the old double glob+sort, which walked
+    # the directory twice and built a Path per entry; the dirent type
+    # check costs no extra stat and scandir never recurses, so the
+    # working subfolders are excluded by construction. Inspection order
+    # does not matter, so nothing is sorted. Files the dirent alone
+    # condemns (Garmin wellness-style names, or too small to hold an
+    # activity) skip the parse pool entirely.
+    cache = _load_cleaner_cache(fit_folder)
+    fresh_cache: Dict[str, list] = {}
+    key_of: Dict[str, str] = {}
+    cached_keeps = 0
+    fits_to_process: List[str] = []
+    quick_junk: List[Tuple[str, str]] = []
+    with os.scandir(fit_folder) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False) and entry.name.lower().endswith(".fit"):
+                reason = _quick_classify(entry)
+                if reason:
+                    quick_junk.append((entry.path, reason))
+                    continue
+                st = entry.stat()
+                key = f"{entry.name}:{st.st_mtime_ns}:{st.st_size}"
+                hit = cache.get(key)
+                if hit:
+                    # Only keys for files still present survive into the
+                    # rewritten cache, so it never accumulates entries
+                    # for long-gone files
+                    fresh_cache[key] = hit
+                    if hit[0] == "move":
+                        quick_junk.append((entry.path, f"cached:{hit[1]}"))
+                    else:
+                        cached_keeps += 1
+                        logger.debug(f"Keeping (cached): {entry.name} (type: {hit[1]})")
+                        if on_keep:
+                            on_keep(entry.path)
+                    continue
+                key_of[entry.path] = key
+                fits_to_process.append(entry.path)
+
+    logger.info(
+        f"Pre-sweep starting: {len(fits_to_process)} files to inspect, "
+        f"{len(quick_junk)} junked by name/size, {cached_keeps} kept from cache"
+    )
+
+    inspected = cached_keeps
     errors = 0
 
-    with tqdm(total=len(fits_to_process), desc="Inspecting FIT files") as pbar:
-        for fit_path in fits_to_process:
-            if not fit_path.exists():
-                # File likely moved by system/antivirus; silently skip
-                pbar.update(1)
-                continue
+    # Renames run on a single background thread so the main loop never
+    # blocks on the filesystem between inspection results; the thread
+    # owns the moved/error counters, which are merged in after join()
+    move_q: queue.Queue = queue.Queue()
+    move_stats = {"moved": 0, "errors": 0}
 
+    junk_str = str(junk_dir)
+
+    def _mover() -> None:
+        while (item := move_q.get()) is not None:
+            src, reason = item
+            name = os.path.basename(src)
             try:
-                # Inspect file IN-PLACE (no intermediate moves)
-                path_str, action, reason = _inspect_fit(str(fit_path))
-                inspected += 1
-
-                if action == 'move':
-                    # Move junk files directly to _junk
-                    dest = junk_dir / fit_path.name
-                    try:
-                        fit_path.replace(dest)
-                        moved += 1
-                        logger.info(f"Moved to _junk: {fit_path.name} (type: {reason})")
-                    except FileNotFoundError:
-                        # File disappeared; skip silently
-                        logger.debug(f"File disappeared during move: {fit_path.name}")
-                    except Exception as e:
-                        logger.warning(f"Could not move {fit_path.name} to _junk: {e}")
-                        errors += 1
-                elif action == 'error':
-                    # Could not parse file; leave it for upload (safer)
-                    logger.warning(f"Could not inspect {fit_path.name}: {reason}")
-                    errors += 1
-                elif action == 'keep':
-                    # Valid activity file
-                    logger.debug(f"Keeping activity: {fit_path.name} (type: {reason})")
-
-            except Exception as e:
-                logger.debug(f"Error processing {fit_path.name}: {e}")
+                # Plain-str os.replace: no per-move Path construction or
+                # pathlib dispatch on the hot rename loop
+                os.replace(src, os.path.join(junk_str, name))
+                move_stats["moved"] += 1
+                logger.info(f"Moved to _junk: {name} ({reason})")
+            except FileNotFoundError:
+                # File disappeared; skip silently
+                logger.debug(f"File disappeared during move: {name}")
+            except OSError as e:
+                logger.warning(f"Could not move {name} to _junk: {e}")
+                move_stats["errors"] += 1
+
+    mover = threading.Thread(target=_mover, name="cleaner-mover")
+    mover.start()
+
+    def _finish() -> Dict[str, Any]:
+        move_q.put(None)
+        mover.join()
+        _save_cleaner_cache(fit_folder, fresh_cache)
+        summary = {
+            "inspected": inspected,
+            "moved": move_stats["moved"],
+            "errors": errors + move_stats["errors"],
+        }
+        logger.info(
+            f"Pre-sweep complete: inspected={summary['inspected']}, "
+            f"moved_to_junk={summary['moved']}, errors={summary['errors']}"
+        )
+        return summary
+
+    for path_str, reason in quick_junk:
+        inspected += 1
+        move_q.put((path_str, reason))
+
+    if not fits_to_process:
+        logger.info("No FIT files left to inspect")
+        return _finish()
+
+    if use_processes:
+        # The shared pool is not closed here: it stays warm for the next
+        # invocation and atexit tears it down once at process exit
+        workers = workers or os.cpu_count() or 1
+        executor = _get_pool(workers)
+    else:
+        # Threads oversubscribe the cores because most of each task is
+        # blocked in file I/O; starting them is cheap enough per call
+        workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    # executor.map streams (path, action, reason) tuples straight back:
+    # _inspect_fit already echoes its path, so the old dict of futures
+    # was pure bookkeeping, and chunksize gives the same IPC
+    # amortization as hand-rolled batches (threads ignore it, which is
+    # fine — they have no pickling to amortize). _inspect_fit converts
+    # every failure into an 'error' tuple, so the iterator never raises.
+    chunksize = max(8, len(fits_to_process) // (workers * 8))
+    results = executor.map(_inspect_fit, fits_to_process, chunksize=chunksize)
+
+    # Coarse refresh: repainting on every file serializes the result
+    # loop on the terminal for big archives; ~200 repaints per sweep,
+    # at most twice a second, reads the same
+    with tqdm(total=len(fits_to_process), desc="Inspecting FIT files",
+              miniters=max(1, len(fits_to_process) // 200), mininterval=0.5) as pbar:
+        for path_str, action, reason in results:
+            fit_path = Path(path_str)
+            inspected += 1
+            # Errors are worth retrying next run; settled verdicts
+            # are remembered against the file's fingerprint
+            if action != 'error':
+                fresh_cache[key_of[path_str]] = [action, reason]
+
+            if action == 'move':
+                # Junk files head to _junk via the mover thread
+                move_q.put((path_str, f"type: {reason}"))
+            elif action == 'error':
+                # Could not parse file; leave it for upload (safer)
+                logger.warning(f"Could not inspect {fit_path.name}: {reason}")
                 errors += 1
+                if on_keep:
+                    on_keep(path_str)
+            elif action == 'keep':
+                # Valid activity file
+                logger.debug(f"Keeping activity: {fit_path.name} (type: {reason})")
+                if on_keep:
+                    on_keep(path_str)
 
             pbar.update(1)
 
-    logger.info(f"Pre-sweep complete: inspected={inspected}, moved_to_junk={moved}, errors={errors}")
-    return {"inspected": inspected, "moved": moved, "errors": errors}
+    if not use_processes:
+        executor.shutdown(wait=True)
+
+    return _finish()
 
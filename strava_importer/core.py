@@ -8,7 +8,6 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-import asyncio
 import logging
 from typing import Optional
 
@@ -34,8 +33,9 @@ class StravaUploader:
 
 	def run(self) -> None:
 		"""Run the uploader synchronously by delegating to the async implementation."""
+		# Delegate to the async uploader's own run(): its _main closes
+		# the shared ClientSession on the loop that created it, so a
+		# bare asyncio.run(run_async(...)) here would leak the session
+		# and connector every invocation
 		uploader = AsyncStravaUploader(self.config)
-		try:
-			asyncio.run(uploader.run_async(max_concurrent=self.max_concurrent))
-		except KeyboardInterrupt:
-			logger.info("Upload cancelled by user")
+		uploader.run(max_concurrent=self.max_concurrent)
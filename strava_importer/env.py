@@ -0,0 +1,26 @@
+"""Memoized environment loading for the uploader.
+
+`load_dotenv` re-reads and re-parses the `.env` file each time it is
+called, and the entrypoints used to invoke it independently at import
+time. `env()` loads the file once per process and hands back the
+settings the uploader cares about.
+"""
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=1)
+def env() -> dict:
+    """Load `.env` once per process and return the uploader settings."""
+    load_dotenv(encoding="utf-8")
+    return {
+        "CLIENT_ID": os.getenv("CLIENT_ID"),
+        "CLIENT_SECRET": os.getenv("CLIENT_SECRET"),
+        "AUTH_CODE": os.getenv("AUTH_CODE"),
+        "FIT_FOLDER": os.getenv("FIT_FOLDER"),
+        "MAX_CONCURRENT": int(os.getenv("MAX_CONCURRENT", "5")),
+    }
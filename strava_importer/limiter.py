@@ -1,102 +1,201 @@
 import asyncio
+import json
 import logging
+import os
 import random
 import time
-from collections import deque
-from typing import Optional
+from pathlib import Path
+from typing import Mapping, Optional
 
 logger = logging.getLogger(__name__)
 
 
 class AsyncRateLimiter:
     """
-    An asyncio-compatible rate limiter that adjusts to Strava's API limits.
-    This limiter avoids very long sleeps that block workers by performing
-    short incremental waits and supports forced backoff with Retry-After.
+    An asyncio-compatible rate limiter driven by Strava's own headers.
+    Every response carries X-RateLimit-Limit ("short,daily") and
+    X-RateLimit-Usage ("short,daily"); scheduling against those instead
+    of a local guess avoids both over-throttling (idle time) and
+    under-throttling (429 retries). Waits are short incremental sleeps
+    so workers stay cancellable and supports forced backoff with
+    Retry-After.
     """
 
-    def __init__(self, initial_daily_limit: int = 1000, initial_window_limit: int = 100):
+    def __init__(self, initial_daily_limit: int = 1000, initial_window_limit: int = 100,
+                 state_file: Optional[Path] = None):
+        # Seed limits are only a conservative guess until the first
+        # response replaces them with the server's values
         self.daily_limit = initial_daily_limit
         self.window_limit = initial_window_limit
-        self.window_size = 15 * 60  # 15 minutes in seconds
-
-        self.daily_count = 0
-        self.daily_start_time = time.time()
-
-        self.window_requests = deque()
-        self._lock = asyncio.Lock()
-
-    def _prune_window(self):
-        """Remove requests from the window that are older than the window size."""
+        self.window_size = 15 * 60  # Strava windows align to clock quarters
+        # Headroom below the hard limit: in-flight requests that have not
+        # produced usage headers yet would otherwise overshoot it
+        self.safety = 2
+
+        # Usage counters and the epoch (window/day index since the Unix
+        # epoch, both UTC-aligned like Strava's resets) they belong to
+        self._short_used = 0
+        self._daily_used = 0
+        self._window_epoch = int(time.time() // self.window_size)
+        self._daily_epoch = int(time.time() // 86400)
+        # Set by update_limits when the server raises our quota, so
+        # waiters parked until the window boundary wake early instead of
+        # sleeping on stale limits. Event.set() is synchronous, which
+        # update_limits (a sync method) needs.
+        self._limits_changed = asyncio.Event()
+
+        # Strava's buckets persist server-side, so two runs inside the
+        # same 15-minute window share a budget the second run would
+        # otherwise not know about until its first response. Persisting
+        # the counters bridges that gap; the first headers of the new
+        # run re-sync with the server regardless.
+        self.state_file = Path(state_file) if state_file else None
+        self._last_persist = 0.0
+        self._load_state()
+
+    def _load_state(self):
+        """Adopt persisted counters that are still inside their window."""
+        if self.state_file is None:
+            return
+        try:
+            data = json.loads(self.state_file.read_bytes())
+        except (OSError, ValueError):
+            return
+        if int(data.get("window_limit", 0)) > 0:
+            self.window_limit = int(data["window_limit"])
+        if int(data.get("daily_limit", 0)) > 0:
+            self.daily_limit = int(data["daily_limit"])
+        if data.get("window_epoch") == self._window_epoch:
+            self._short_used = int(data.get("short_used", 0))
+        if data.get("daily_epoch") == self._daily_epoch:
+            self._daily_used = int(data.get("daily_used", 0))
+
+    def _persist_state(self):
+        """Write the counters back atomically, at most every few seconds.
+
+        A crash loses a couple of seconds of local counting at worst;
+        update_limits restores server truth on the next response. The
+        tmp-then-replace keeps a concurrent reader from seeing a torn
+        file.
+        """
+        if self.state_file is None:
+            return
         now = time.time()
-        while self.window_requests and self.window_requests[0] < now - self.window_size:
-            self.window_requests.popleft()
+        if now - self._last_persist < 2.0:
+            return
+        self._last_persist = now
+        tmp = self.state_file.with_name(self.state_file.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps({
+                "window_epoch": self._window_epoch,
+                "short_used": self._short_used,
+                "daily_epoch": self._daily_epoch,
+                "daily_used": self._daily_used,
+                "window_limit": self.window_limit,
+                "daily_limit": self.daily_limit,
+            }))
+            os.replace(tmp, self.state_file)
+        except OSError:
+            logger.debug("Could not persist rate-limit state to %s", self.state_file)
+
+    def _roll_windows(self, now: float):
+        """Zero the usage counters when their window has rolled over.
+
+        Takes the caller's clock reading so one acquire never reads the
+        clock twice. Wall-clock time is deliberate throughout: Strava's
+        windows reset on clock quarter-hours and UTC midnight, which a
+        monotonic clock cannot express.
+        """
+        window_epoch = int(now // self.window_size)
+        if window_epoch != self._window_epoch:
+            self._window_epoch = window_epoch
+            self._short_used = 0
+        daily_epoch = int(now // 86400)
+        if daily_epoch != self._daily_epoch:
+            self._daily_epoch = daily_epoch
+            self._daily_used = 0
 
     async def acquire(self):
-        """Acquire a permit to make a request, waiting in short increments if needed."""
-        # Use a loop with short sleeps so workers don't get blocked for very long
+        """Acquire a permit to make a request, waiting in short increments if needed.
+
+        A permit optimistically bumps both counters; update_limits later
+        reconciles them with the server's view. When the window is
+        spent, capacity can only reappear at the next quarter-hour (or
+        UTC-midnight) boundary — permits are never released early — so
+        each waiter sleeps exactly to that boundary in one cancellable
+        wait, woken sooner only if the server raises the quota.
+        """
         while True:
-            async with self._lock:
-                now = time.time()
-
-                # Reset daily count if a day has passed
-                if now - self.daily_start_time > 24 * 3600:
-                    self.daily_count = 0
-                    self.daily_start_time = now
-
-                if self.daily_count >= self.daily_limit:
-                    logger.info("Daily limit of %d reached. Sleeping for 24 hours.", self.daily_limit)
-                    # Keep a cooperative short-sleep loop even for daily limit to allow cancellation
-                    # Sleep in 60-second increments up to 24 hours
-                    remaining = 24 * 3600
-                    while remaining > 0:
-                        to_sleep = min(60, remaining)
-                        await asyncio.sleep(to_sleep)
-                        remaining -= to_sleep
-                    self.daily_count = 0
-                    self.daily_start_time = time.time()
-
-                self._prune_window()
-
-                if len(self.window_requests) < self.window_limit:
-                    # permit one request
-                    self.window_requests.append(time.time())
-                    self.daily_count += 1
-                    return
-
-                # compute how long until the oldest request falls out of the window
-                wait_time = self.window_requests[0] + self.window_size - now
-
-            # Release lock and wait a short time before retrying to acquire
-            # Sleep in small increments (max 5s) so backpressure is cooperative
-            sleep_for = min(max(wait_time, 0.5), 5.0)
-            logger.debug("RateLimiter waiting %.1fs before trying again", sleep_for)
-            await asyncio.sleep(sleep_for)
-
-    def update_limits(self, headers: Optional[dict]):
-        """Update rate limits based on Strava API response headers."""
+            # Lock-free: no await separates the capacity check from the
+            # counter bumps, and every other mutator (update_limits,
+            # _roll_windows) is synchronous on the same event loop, so
+            # the check-then-bump can never interleave mid-flight. The
+            # old asyncio.Lock bought an acquire/release pair per permit
+            # and protected nothing.
+            now = time.time()
+            self._roll_windows(now)
+            if (self._short_used < self.window_limit - self.safety
+                    and self._daily_used < self.daily_limit - self.safety):
+                self._short_used += 1
+                self._daily_used += 1
+                return
+
+            if self._short_used >= self.window_limit - self.safety:
+                wait_time = (self._window_epoch + 1) * self.window_size - now
+                exhausted = "15-minute window"
+            else:
+                wait_time = (self._daily_epoch + 1) * 86400 - now
+                exhausted = "daily quota"
+
+            # A wake lost to the clear/wait race just means sleeping to
+            # the boundary anyway, which is the correct upper bound
+            self._limits_changed.clear()
+            logger.debug("RateLimiter %s spent; waiting %.0fs to reset", exhausted, wait_time)
+            try:
+                await asyncio.wait_for(self._limits_changed.wait(),
+                                       timeout=max(wait_time, 0.0) + 0.05)
+            except TimeoutError:
+                pass
+
+    def update_limits(self, headers: Optional[Mapping]):
+        """Update limits and usage from Strava API response headers.
+
+        Accepts any mapping, including aiohttp's CIMultiDictProxy, so
+        callers can pass response headers without copying them. Both
+        headers carry "short,daily" pairs: Limit holds the quotas, Usage
+        the requests already spent against them.
+        """
         if not headers:
             return
 
         try:
-            short_term_usage, short_term_limit = map(int, headers.get("X-RateLimit-Usage", "0,0").split(','))
-            long_term_usage, long_term_limit = map(int, headers.get("X-RateLimit-Limit", "0,0").split(','))
-
-            # Only update if values look sane
-            if short_term_limit > 0:
-                self.window_limit = short_term_limit
-            if long_term_limit > 0:
-                self.daily_limit = long_term_limit
-
-            # Adjust current counts based on headers
-            now = time.time()
-            self._prune_window()
-
-            # Update window count to match the server's view
-            while len(self.window_requests) < short_term_usage:
-                self.window_requests.append(now)
-
-            self.daily_count = long_term_usage
+            # partition instead of split: no list allocation for a
+            # two-field header parsed on every single response
+            limit = headers.get("X-RateLimit-Limit")
+            if limit:
+                a, _, b = limit.partition(',')
+                short_limit, daily_limit = int(a), int(b)
+                raised = (short_limit > self.window_limit or daily_limit > self.daily_limit)
+                if short_limit > 0:
+                    self.window_limit = short_limit
+                if daily_limit > 0:
+                    self.daily_limit = daily_limit
+                if raised:
+                    # Quota grew: wake boundary-parked waiters to re-check
+                    self._limits_changed.set()
+
+            usage = headers.get("X-RateLimit-Usage")
+            if usage:
+                a, _, b = usage.partition(',')
+                short_used, daily_used = int(a), int(b)
+                self._roll_windows(time.time())
+                # The server count is ground truth for settled requests
+                # but lags our optimistic count by whatever is still in
+                # flight, so take the max rather than overwrite
+                self._short_used = max(self._short_used, short_used)
+                self._daily_used = max(self._daily_used, daily_used)
+
+            self._persist_state()
 
         except (ValueError, IndexError):
             logger.info("Could not parse Strava rate limit headers.")
@@ -106,7 +205,7 @@ class AsyncRateLimiter:
 
         If `retry_after` is provided (seconds), respect it up to a cap. Otherwise use
         a sensible default based on window size and current limit, clamped to a range.
-        Backoff uses small increments and jitter to stay cooperative.
+        Jitter de-synchronizes workers that hit the 429 together.
         """
         if retry_after is None:
             # base wait proportional to the per-request spacing, but clamp
@@ -124,9 +223,7 @@ class AsyncRateLimiter:
         total = wait_time + jitter
         logger.info("Forced backoff due to 429. Sleeping for %.1f seconds (retry_after=%s).", total, retry_after)
 
-        remaining = total
-        # Sleep in short increments so tasks can be cancelled cooperatively
-        while remaining > 0:
-            to_sleep = min(5.0, remaining)
-            await asyncio.sleep(to_sleep)
-            remaining -= to_sleep
+        # One sleep for the whole backoff: asyncio.sleep is already
+        # interrupted immediately by cancellation, so chunking it only
+        # added scheduler wakeups
+        await asyncio.sleep(total)
@@ -11,6 +11,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import random
 from typing import Callable, Awaitable, Optional, Tuple, Any
 
 import aiohttp
@@ -36,26 +37,39 @@ class UploadPoller:
         limiter: AsyncRateLimiter,
         session: aiohttp.ClientSession,
         status_url_template: str,
-        poll_interval: float = 2.0,
+        poll_interval: float = 0.5,
+        max_wait: float = 300.0,
+        headers_cb: Optional[Callable[[], Awaitable[dict]]] = None,
+        concurrency: int = 4,
     ) -> None:
         self.auth = auth
         self.limiter = limiter
         self.session = session
         self.status_url_template = status_url_template
+        # Optional async provider of cached auth headers; avoids a
+        # blocking ensure_token() call on the loop per polled upload
+        self.headers_cb = headers_cb
+        # First poll delay; doubles per attempt up to a 10s cap
         self.poll_interval = poll_interval
+        # Total time budget per upload before reporting timed_out
+        self.max_wait = max_wait
 
         # fit_path and callback are intentionally loosely typed to support
         # Path or str for fit_path and different callback signatures.
         self._queue: asyncio.Queue[Tuple[int, object, Callable[[object, dict], Awaitable[Any]]]] = asyncio.Queue()
         self._task: Optional[asyncio.Task] = None
-        self._stopping = False
+        # Each enqueued upload gets its own poll task so one slow upload
+        # never holds back the others' status checks; the semaphore caps
+        # how many GETs are in flight at once (their backoff sleeps run
+        # outside it)
+        self._sem = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
 
     def start(self) -> None:
         if self._task is None:
             self._task = asyncio.create_task(self._run())
 
     async def stop(self) -> None:
-        self._stopping = True
         # Wait until queue is drained
         await self._queue.join()
         if self._task:
@@ -69,66 +83,117 @@ class UploadPoller:
         await self._queue.put((upload_id, fit_path, callback))
 
     async def _run(self) -> None:
+        # The dispatcher only hands uploads to their own tasks; stop()
+        # waits on queue.join(), which settles once every task has
+        # called task_done, so in-flight polls always finish first
         backoff_base = self.poll_interval
         try:
             while True:
                 upload_id, fit_path, callback = await self._queue.get()
-                try:
-                    await self._poll_and_handle(upload_id, fit_path, callback, backoff_base)
-                except Exception:
-                    logger.exception("Error while polling upload %s", upload_id)
-                    # If polling fails hard, call callback with a timed_out status
-                    try:
-                        await callback(fit_path, {"id": upload_id, "status": "timed_out"})
-                    except Exception:
-                        logger.exception("Callback failed for %s after polling error", fit_path)
-                finally:
-                    self._queue.task_done()
-
-                if self._stopping and self._queue.empty():
-                    break
+                task = asyncio.create_task(self._poll_one(upload_id, fit_path, callback, backoff_base))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
         except asyncio.CancelledError:
             logger.debug("UploadPoller task cancelled")
 
-    async def _poll_and_handle(self, upload_id: int, fit_path: object, callback: Callable[[object, dict], Awaitable[Any]], backoff_base: float) -> None:
-        token = self.auth.ensure_token()
-        headers = {"Authorization": f"Bearer {token}"}
+    async def _poll_one(self, upload_id: int, fit_path: object, callback, backoff_base: float) -> None:
+        try:
+            await self._poll_and_handle(upload_id, fit_path, callback, backoff_base)
+        except Exception:
+            logger.exception("Error while polling upload %s", upload_id)
+            # If polling fails hard, call callback with a timed_out status
+            try:
+                await callback(fit_path, {"id": upload_id, "status": "timed_out"})
+            except Exception:
+                logger.exception("Callback failed for %s after polling error", fit_path)
+        finally:
+            self._queue.task_done()
 
+    async def _poll_and_handle(self, upload_id: int, fit_path: object, callback: Callable[[object, dict], Awaitable[Any]], backoff_base: float) -> None:
+        if self.headers_cb is not None:
+            headers = await self.headers_cb()
+        else:
+            token = self.auth.ensure_token()
+            headers = {"Authorization": f"Bearer {token}"}
+
+        # Exponential backoff from a short first delay: most uploads are
+        # processed within a second or two, so a small initial poll catches
+        # them quickly, while doubling delays keep slow ones cheap. A
+        # wall-clock deadline bounds the total wait instead of a fixed
+        # attempt count, so long-tail uploads get more time without more
+        # requests.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
         attempt = 0
-        backoff = backoff_base
+        delay = backoff_base
+        # ETag of the last status body; conditional re-polls come back
+        # as a bodyless 304 while the upload is still processing, so
+        # only a genuinely changed status pays the JSON transfer+parse
+        etag: Optional[str] = None
+        url = self.status_url_template.format(upload_id=upload_id)
         while True:
             attempt += 1
+            retry_after = None
             try:
-                await self.limiter.acquire()
-                url = self.status_url_template.format(upload_id=upload_id)
-                async with self.session.get(url, headers=headers) as resp:
-                    # Convert headers to plain dict for update_limits
-                    self.limiter.update_limits(dict(resp.headers))
-                    if resp.status == 429:
-                        ra = resp.headers.get("Retry-After")
-                        # Try to parse Retry-After as seconds when possible
-                        ra_val = None
-                        if ra:
+                # The semaphore bounds concurrent GETs across poll
+                # tasks; backoff sleeps below run outside it so a
+                # waiting upload never blocks another's check
+                async with self._sem:
+                    await self.limiter.acquire()
+                    req_headers = headers if etag is None else {**headers, "If-None-Match": etag}
+                    async with self.session.get(url, headers=req_headers) as resp:
+                        # One binding of the header proxy per response;
+                        # update_limits only does keyed .get() lookups, so it
+                        # goes in as-is with no dict copy
+                        hdrs = resp.headers
+                        self.limiter.update_limits(hdrs)
+                        if resp.status == 429:
+                            ra = hdrs.get("Retry-After")
+                            # Try to parse Retry-After as seconds when possible
+                            ra_val = None
+                            if ra:
+                                try:
+                                    ra_val = float(ra)
+                                except Exception:
+                                    ra_val = None
+                            logger.warning("Poller: 429 for upload %s, Retry-After=%s", upload_id, ra)
+                            await self.limiter.force_backoff(ra_val)
+                            # retry after backoff loop
+                            continue
+
+                        if resp.status == 304:
+                            # Status unchanged since the last poll: nothing
+                            # to read; fall through to the backoff sleep
+                            logger.debug("Poller: 304 for upload %s (still processing)", upload_id)
+                        elif resp.status >= 500:
+                            # Server hiccup: honor Retry-After if given, else
+                            # fall through to the normal backoff sleep
+                            ra = hdrs.get("Retry-After")
                             try:
-                                ra_val = float(ra)
-                            except Exception:
-                                ra_val = None
-                        logger.warning("Poller: 429 for upload %s, Retry-After=%s", upload_id, ra)
-                        await self.limiter.force_backoff(ra_val)
-                        # retry after backoff loop
-                        continue
-
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    # If activity is created or an error/duplicate occurred, call callback
-                    status_text = data.get("status", "")
-                    if data.get("activity_id") or "error" in data or "duplicate" in status_text:
-                        await callback(fit_path, data)
-                        return
+                                retry_after = float(ra) if ra else None
+                            except (TypeError, ValueError):
+                                retry_after = None
+                            logger.warning("Poller: HTTP %d for upload %s", resp.status, upload_id)
+                        else:
+                            resp.raise_for_status()
+                            etag = hdrs.get("ETag") or etag
+                            data = await resp.json()
+                            # If activity is created or an error/duplicate occurred, call callback
+                            status_text = data.get("status", "")
+                            if data.get("activity_id") or "error" in data or "duplicate" in status_text:
+                                await callback(fit_path, data)
+                                return
 
             except aiohttp.ClientError as e:
                 logger.warning("Poll attempt %d for %s failed: %s", attempt, upload_id, e)
 
-            # If we get here, wait and try again with incremental backoff (capped)
-            await asyncio.sleep(backoff)
-            backoff = min(backoff * 1.5, 10.0)
+            if loop.time() >= deadline:
+                logger.warning("Poller: upload %s still processing after %.0fs; giving up", upload_id, self.max_wait)
+                await callback(fit_path, {"id": upload_id, "status": "timed_out"})
+                return
+
+            # Wait and try again; jitter de-synchronizes polls for uploads
+            # enqueued at the same moment
+            sleep_for = retry_after if retry_after is not None else delay * random.uniform(0.9, 1.1)
+            await asyncio.sleep(min(sleep_for, max(deadline - loop.time(), 0.1)))
+            delay = min(delay * 2, 10.0)
@@ -0,0 +1,72 @@
+"""On-disk cache of FIT content digests already settled on Strava.
+
+Strava only reports a duplicate with a 409 *after* the full multipart
+POST, so re-running the uploader over a folder that was already
+migrated pays the complete upload cost per file just to learn nothing
+changed. Files that came back 201 (with an activity_id) or 409 in a
+past run will do so again, so their content digests are remembered in
+a sqlite sidecar and matching files are skipped before the POST.
+"""
+from pathlib import Path
+import hashlib
+import mmap
+import sqlite3
+import time
+
+CACHE_NAME = ".strava_seen_cache.sqlite"
+
+
+def hash_fit(path) -> str:
+    """Content digest of a FIT file, hashed straight from the page cache.
+
+    A read-only mmap lets blake2b consume the file in one C call with no
+    user-space buffer copy, so files the caches reject are never read
+    into Python at all. blake2b is the fastest hash in hashlib and 16
+    bytes of digest is plenty for dedup.
+    """
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.blake2b(mm, digest_size=16).hexdigest()
+        except ValueError:
+            # Empty files cannot be mmapped; their digest is constant
+            return hashlib.blake2b(digest_size=16).hexdigest()
+
+
+class SeenCache:
+    """Digest -> upload outcome map persisted next to the FIT folder."""
+
+    # Outcomes that make a re-upload pointless; anything else (failed,
+    # error) should be retried on the next run
+    SKIP_STATUSES = frozenset({"created", "duplicate"})
+
+    def __init__(self, folder: Path):
+        self.conn = sqlite3.connect(Path(folder) / CACHE_NAME)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            "digest TEXT PRIMARY KEY, status TEXT, activity_id INTEGER, ts INTEGER)"
+        )
+        # Load everything once; lookups on the upload hot path are then
+        # plain dict reads with no sqlite round-trip
+        self._rows = {
+            digest: (status, activity_id)
+            for digest, status, activity_id in self.conn.execute(
+                "SELECT digest, status, activity_id FROM seen"
+            )
+        }
+
+    def lookup(self, digest: str):
+        """Return (status, activity_id) for a known digest, else None."""
+        return self._rows.get(digest)
+
+    def mark(self, digest: str, status: str, activity_id=None) -> None:
+        """Record the settled outcome for a digest."""
+        self._rows[digest] = (status, activity_id)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO seen (digest, status, activity_id, ts) VALUES (?, ?, ?, ?)",
+            (digest, status, activity_id, int(time.time())),
+        )
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
@@ -4,16 +4,42 @@ Currently contains logging configuration helper used by `main.py`.
 """
 from __future__ import annotations
 
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
+# Listener thread owning the real handlers; module scope so a
+# reconfigure stops the previous one and exit flushes the last records
+_listener: Optional[QueueListener] = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
 
 def configure_logging(log_file: str = "strava_upload.log", level: int = logging.INFO, truncate: bool = True) -> None:
     """Configure root logger to write to both console and file.
 
     If `truncate` is True and the file exists, it will be truncated at startup.
+
+    The file/console handlers are not attached to the root logger
+    directly: each logger.* call would then block its caller on the
+    write, which on the event loop stalls every in-flight upload for
+    the duration of a flush. Records go through a QueueHandler to a
+    listener thread that owns the real handlers, so emitting a record
+    costs a queue put.
     """
+    global _listener
+
     # Ensure parent dir exists
     log_path = Path(log_file)
     if log_path.parent and not log_path.parent.exists():
@@ -27,7 +53,8 @@ def configure_logging(log_file: str = "strava_upload.log", level: int = logging.
     root = logging.getLogger()
     root.setLevel(level)
 
-    # Remove existing handlers to avoid duplicates
+    # Remove existing handlers (and listener) to avoid duplicates
+    _stop_listener()
     for h in list(root.handlers):
         root.removeHandler(h)
 
@@ -43,5 +70,7 @@ def configure_logging(log_file: str = "strava_upload.log", level: int = logging.
     ch.setFormatter(fmt)
     ch.setLevel(logging.WARNING)  # Only show warnings/errors in terminal
 
-    root.addHandler(fh)
-    root.addHandler(ch)
+    log_q: queue.Queue = queue.Queue(-1)
+    root.addHandler(QueueHandler(log_q))
+    _listener = QueueListener(log_q, fh, ch, respect_handler_level=True)
+    _listener.start()